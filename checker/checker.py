@@ -1,24 +1,37 @@
-import json
+import os
 import sys
 # from pathlib import Path
 from itertools import combinations
-from typing import Dict
+from typing import Dict, List, Mapping, Sequence, Tuple, Union
+
+if __package__ in (None, ""):
+    # 以脚本运行（python checker/checker.py）时,使仓库根目录下的 src 可导入
+    sys.path.insert(
+        0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.catalog import (CourseView, OfferingView, resolve_course_files,
+                               shared_catalog)
+from src.core.jsonstream import iter_json_array
+from src.core.timemask import is_time_conflict, pack_times, spread_mask
 
 COURSE_FILE = "data\\course.json"
 SCHEDULE_FILE = "data\\schedule.json"
 
 
 def load_json(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """逐条读取顶层为数组的 JSON 文件"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(2, "No such file or directory", path)
+    return iter_json_array(path)
 
 
 class ClassInfo:
-    __slots__ = ("times", "weeks")
+    __slots__ = ("times", "weeks", "mask")
 
     def __init__(self, times, weeks):
         self.times = times
         self.weeks = weeks
+        self.mask = spread_mask(pack_times(times), weeks)
 
 
 class CourseInfo:
@@ -32,61 +45,108 @@ class CourseInfo:
         self.classes = {}
 
 
+# 课程id -> 课程（由 main 载入；课程表无法编译时为 load_courses 的结果）
+course_map: Mapping[str, Union[CourseView, CourseInfo]] = {}
+
+
+def course_info(course: Union[CourseView, CourseInfo]) -> CourseInfo:
+    if isinstance(course, CourseInfo):
+        return course
+    info = CourseInfo()
+    info.name = course.name
+    info.credit = int(course.credit)
+    info.prereq = course.prerequisites
+    info.required = course.required
+    return info
+
+
+def load_courses(course_file: Union[str, Sequence[str]]
+                 ) -> Dict[str, CourseInfo]:
+    """逐条宽松解析 course.json（兼容 course_id/course_name/class_id 等字段名）
+
+    课程表无法编译为 CompactCatalog 时使用。course_file 同 shared_catalog,
+    可为路径、glob 模式或它们的列表,各文件依次流式读取；
+    不同文件中的课程id重复时抛出 ValueError。
+    """
+    courses: Dict[str, CourseInfo] = {}
+    origin: Dict[str, str] = {}
+    for path in resolve_course_files(course_file):
+        for course_raw in load_json(path):
+            course_id = course_raw.get("course_id") or course_raw.get("id")
+            if not course_id:
+                continue
+            first = origin.setdefault(course_id, path)
+            if first != path:
+                raise ValueError(f"Duplicate course id {course_id!r} "
+                                 f"in {first} and {path}")
+            info = CourseInfo()
+            info.name = course_raw.get("course_name") or course_raw.get(
+                "name", "")
+            info.credit = int(course_raw.get("credit", 0))
+            info.prereq = list(course_raw.get("prerequisites", []))
+            info.required = course_raw.get("required", "")
+            for off in course_raw.get("offerings", []):
+                cls_id = off.get("class_id") or off.get("id")
+                if not cls_id:
+                    continue
+                times = [int(x) for x in off.get("times", [0] * 7)]
+                weeks = int(off.get("weeks", 0))
+                info.classes[cls_id] = ClassInfo(times, weeks)
+            courses[course_id] = info
+    return courses
+
+
 def wrap(cid):
     name = course_map.get(cid, CourseInfo()).name
     return f"{cid}（{name}）" if name else cid
 
 
 def overlap(a: ClassInfo, b: ClassInfo) -> bool:
-    if a.weeks & b.weeks == 0:
-        return False
-    return any(ta & tb for ta, tb in zip(a.times, b.times))
+    return is_time_conflict(a.mask, b.mask)
 
 
 def main(*,
-         course_file: str = COURSE_FILE,
+         course_file: Union[str, Sequence[str]] = COURSE_FILE,
          schedule_file: str = SCHEDULE_FILE):
+    global course_map
     try:
-        courses_raw = load_json(course_file)
+        try:
+            catalog = shared_catalog(course_file)
+        except ValueError:
+            catalog = None  # 条目无法编译：退回逐条宽松解析
+            course_map = load_courses(course_file)
         schedule_raw = load_json(schedule_file)
     except FileNotFoundError as e:
         sys.exit(f"文件缺失: {e.filename}")
+    except ValueError as e:
+        sys.exit(f"课程表无效: {e}")
 
-    all_required: int = 0
+    if catalog is not None:
+        course_map = catalog.courses
+        all_required: int = sum(catalog.required)
+        offering_index = catalog.offering_index()
+    else:
+        all_required = sum(info.required == "Compulsory"
+                           for info in course_map.values())
     sel_required: int = 0
 
+    # 逐条读取方案,只为其中出现的课程及所选教学班建立 CourseInfo/ClassInfo
     courses: Dict[str, CourseInfo] = {}
-    for course_raw in courses_raw:
-        course_id = course_raw.get("course_id") or course_raw.get("id")
-        if not course_id:
-            continue
-        course_info = CourseInfo()
-        course_info.name = course_raw.get("course_name") or course_raw.get(
-            "name", "")
-        course_info.credit = int(course_raw.get("credit", 0))
-        course_info.prereq = list(course_raw.get("prerequisites", []))
-        course_info.required = course_raw.get("required", "")
-
-        all_required += 1 if course_info.required == "Compulsory" else 0
-
-        for off in course_raw.get("offerings", []):
-            cls_id = off.get("class_id") or off.get("id")
-            if not cls_id:
-                continue
-            times = [int(x) for x in off.get("times", [0] * 7)]
-            weeks = int(off.get("weeks", 0))
-            course_info.classes[cls_id] = ClassInfo(times, weeks)
-
-        courses[course_id] = course_info
-
     selecteds = {}
     for e in schedule_raw:
         course_id = e.get("course_id") or e.get("id")
         if not course_id:
             continue
+        if course_id in course_map and course_id not in courses:
+            courses[course_id] = course_info(course_map[course_id])
         semester = int(e.get("semester", -1))
         cls_id = e.get("class_id") or e.get("class") or ""
         selecteds[course_id] = (semester, cls_id)
+        j = None if catalog is None else offering_index.get(
+            (course_id, cls_id))
+        if semester >= 0 and j is not None:
+            off = OfferingView(catalog, j)
+            courses[course_id].classes[cls_id] = ClassInfo(off.times, off.weeks)
         if courses.get(course_id, None) is not None:
             if semester >= 0:
                 sel_required += 1 if courses[
@@ -105,7 +165,7 @@ def main(*,
             errors.append(f"课程 {wrap(course_id)} 的班号 {cls} 不在 offerings 中")
 
     for course_id, (sem, _) in selecteds.items():
-        if sem < 0:
+        if sem < 0 or course_id not in courses:
             continue
         for pre in courses[course_id].prereq:
             p_sem = selecteds.get(pre, (-1, ""))[0]
@@ -115,7 +175,7 @@ def main(*,
                 errors.append(f"课程 {wrap(course_id)} 的先修课 {wrap(pre)} "
                               f"学期 {p_sem} 需早于本课学期 {sem}")
 
-    sem_table = {}
+    sem_table: Dict[int, List[Tuple[str, ClassInfo]]] = {}
     for course_id, (sem, cls) in selecteds.items():
         if sem < 0 or course_id not in courses:
             continue
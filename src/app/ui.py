@@ -7,6 +7,8 @@ from src.cli.cli_util import CourseSchedulerCli
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+SEARCH_LIMIT = 50  # 查课结果最多显示的课程数（按匹配程度排序）
+
 
 class CourseSchedulerApp:
 
@@ -51,8 +53,17 @@ class CourseSchedulerApp:
         self.create_schedule_display()
         # Show default page (main)
         self.show_page("main")
+        # Merge the edit journal into schedule file on exit
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.root.mainloop()
 
+    def on_close(self):
+        try:
+            self.cli.compact_journal()
+        except Exception as e:
+            messagebox.showerror("错误", f"保存课表失败: {str(e)}")
+        self.root.destroy()
+
     # ---Left Panel Navigation Buttons---
     def create_left_navigation(self):
         nav_frame = ctk.CTkFrame(self.left_panel)
@@ -93,7 +104,7 @@ class CourseSchedulerApp:
                 # Attempt to load schedule (file if configured)
                 self.cli.load_schedule(schedule_file=None)
                 self.schedule_table = self.cli.get_schedule_table(
-                    self.sem_var.get())
+                    self.sem_var.get(), self.week_var.get())
                 self.display_schedule()
             except Exception as e:
                 messagebox.showerror("错误", f"加载课表失败: {str(e)}")
@@ -140,7 +151,8 @@ class CourseSchedulerApp:
                                     text=str(i + 1),
                                     variable=self.sem_var,
                                     value=i,
-                                    font=self.font_cn)
+                                    font=self.font_cn,
+                                    command=self.get_schedule_table)
             rb.pack(anchor="w")
         # Column3: weeks radio 1-20
         self.week_var = ctk.IntVar(value=1)
@@ -150,7 +162,8 @@ class CourseSchedulerApp:
                                     text=str(i + 1),
                                     variable=self.week_var,
                                     value=i,
-                                    font=self.font_cn)
+                                    font=self.font_cn,
+                                    command=self.get_schedule_table)
             rb.pack(anchor="w")
 
     # ---Subpage1 (Course Management)---
@@ -299,7 +312,10 @@ class CourseSchedulerApp:
                                      command=lambda r=i: self.toggle_row(r))
             cb_row.grid(row=i + 1, column=8)
         # Bottom row: column selects and all-select
-        ctk.CTkLabel(grp3, text="", width=70).grid(row=14, column=0)
+        # 避开禁排时间后仍可排的课程数
+        self.forbid_info = ctk.CTkLabel(grp3, text="", width=70,
+                                        font=self.font_cn)
+        self.forbid_info.grid(row=14, column=0)
         for j in range(7):
             cb_col = ctk.CTkCheckBox(grp3,
                                      text="",
@@ -383,7 +399,8 @@ class CourseSchedulerApp:
     def get_schedule_table(self):
         try:
             semester = self.sem_var.get()
-            self.schedule_table = self.cli.get_schedule_table(semester)
+            week = self.week_var.get()
+            self.schedule_table = self.cli.get_schedule_table(semester, week)
             self.display_schedule()
         except Exception as e:
             messagebox.showerror("错误", f"获取课表失败: {str(e)}")
@@ -399,7 +416,8 @@ class CourseSchedulerApp:
     def search_courses(self):
         keyword = self.search_course_var.get()
         try:
-            results = self.cli.get_course_info(course_keyword=keyword)
+            results = self.cli.get_course_info(course_keyword=keyword,
+                                               limit=SEARCH_LIMIT + 1)
         except Exception as e:
             messagebox.showerror("错误", f"查询失败: {str(e)}")
             return
@@ -407,7 +425,10 @@ class CourseSchedulerApp:
         self.output_text.delete("0.0", "end")
         if len(results) == 0:
             self.output_text.insert("end", "<No Item>\n")
-        for course, attended in results.items():
+        for k, (course, attended) in enumerate(results.items()):
+            if k == SEARCH_LIMIT:
+                self.output_text.insert("end", "...\n")
+                break
             line1 = (f"{course.id}, {course.name}, "
                      f"{course.required}, {'已选' if attended else '未选'}\n")
             self.output_text.insert("end", line1)
@@ -423,7 +444,6 @@ class CourseSchedulerApp:
         oid = self.search_offer_var.get()
         status = self.cli.add_course(course_id=cid, offer_id=oid)
         if status == 0:
-            self.cli.dump_schedule(schedule_file=None)
             messagebox.showinfo("提示", "添加成功")
         else:
             messagebox.showerror("错误", f"添加失败，状态码: {status}")
@@ -432,7 +452,6 @@ class CourseSchedulerApp:
         cid = self.search_course_var.get()
         status = self.cli.remove_course(course_id=cid)
         if status == 0:
-            self.cli.dump_schedule(schedule_file=None)
             messagebox.showinfo("提示", "移除成功")
         else:
             messagebox.showerror("错误", f"移除失败，状态码: {status}")
@@ -442,7 +461,6 @@ class CourseSchedulerApp:
         oid = self.search_offer_var.get()
         status = self.cli.update_course(course_id=cid, offer_id=oid)
         if status == 0:
-            self.cli.dump_schedule(schedule_file=None)
             messagebox.showinfo("提示", "修改成功")
         else:
             messagebox.showerror("错误", f"修改失败，状态码: {status}")
@@ -466,7 +484,6 @@ class CourseSchedulerApp:
         if status == -1:
             messagebox.showerror("错误", "课程ID无效")
         else:
-            self.cli.dump_schedule(schedule_file=None)
             messagebox.showinfo("提示", "优先级已设置")
 
     # ---Configuration Callbacks (Subpage2)---
@@ -513,6 +530,8 @@ class CourseSchedulerApp:
                     mask |= (1 << i)
             timelist.append(mask)
         self.cli.config_set_forbid_time(timelist)
+        available = self.cli.count_available_courses(timelist)
+        self.forbid_info.configure(text=f"可排{available}门")
 
     def toggle_row(self, r):
         val = self.row_vars[r].get()
@@ -14,6 +14,8 @@ from src.core.schedule_util import (
     ScheduleVisualizer
 )
 
+from src.core.timemask import pack_times
+
 from checker import checker
 
 from dataclasses import dataclass
@@ -35,6 +37,7 @@ class Config:
     enable_required: bool = False
     enable_forbid_time: bool = False
     enable_limit_credit: bool = False
+    strategy: str = "greedy"  # "greedy", "exact", "cp" 或 "multistart"
 
 
 class CourseSchedulerCli:
@@ -57,7 +60,7 @@ class CourseSchedulerCli:
         self.sv: ScheduleVisualizer = ScheduleVisualizer(
             course_file=self.config.course_file,
             schedule_file=self.config.schedule_file,
-            cs=cs
+            cs=self.cs
         )
 
     def mainloop(self):
@@ -96,6 +99,7 @@ class CourseSchedulerCli:
         except KeyboardInterrupt:
             print()
             print(MDOC[-1])
+        self.compact_journal()
         print()
 
     def _submenu_init(self):
@@ -458,37 +462,46 @@ class CourseSchedulerCli:
             config: Config = self.config
         self.cs: CourseScheduler = CourseScheduler(
             course_file=config.course_file)
+        self.sv.cs = self.cs
         try:
             self.sv.load_schedule(schedule_file=config.schedule_file)
         except Exception:
             ...
 
-    def run_cs(self, min_credit: int = 100, *, config: Config = None):
-        """run/re-run Course Scheduler: will dump schedule.json"""
+    def run_cs(self,
+               min_credit: int = 100,
+               *,
+               config: Config = None,
+               persist: bool = True):
+        """run/re-run Course Scheduler: will dump schedule.json if persist"""
         if config is None:
             config = self.config
         if config.enable_forbid_time:
             self.cs.set_forbidden_times(config.forbid_time)
         else:
             self.cs.set_forbidden_times(DEFAULT_TIMELIST[:])
-        self.sv.dump_schedule(schedule_file=config.schedule_file)
-        self.cs.schedule_courses(
+        plan = self.cs.schedule_courses(
             min_credits=min_credit,
             course_lower_limit=config.course_lower_limit,
-            schedule_file=config.schedule_file,
             enable_required=config.enable_required,
             credit_limit_per_sem=config.credit_limit
-            if config.enable_limit_credit else 5000)
-        self.sv.load_schedule(schedule_file=config.schedule_file)
-
-    def get_schedule_table(self, semester: int) -> List[List[Schedule]]:
-        """will return a schedule table of that semester."""
-        self.sv.load_schedule(schedule_file=self.config.schedule_file)
-        return self.sv.get_schedule_table(semester=semester)
+            if config.enable_limit_credit else 5000,
+            strategy=config.strategy)
+        self.sv.adopt_plan(plan)
+        if persist:
+            self.sv.dump_schedule(schedule_file=config.schedule_file)
+
+    def get_schedule_table(self,
+                           semester: int,
+                           week: int = None) -> List[List[Schedule]]:
+        """will return a schedule table of that semester (and week).
+
+        Tables are cached until the semester is modified; do not modify them.
+        """
+        return self.sv.get_schedule_table(semester=semester, week=week)
 
     def _visual_cli(self, semester: int, weeks: int = 1):
-        self.load_schedule(schedule_file=self.config.schedule_file)
-        schedule_table = self.get_schedule_table(semester)
+        schedule_table = self.get_schedule_table(semester, weeks)
 
         print(SEP_EQUAL)
         print(f"SEM {semester + 1}\nWeek {weeks + 1}", TABLE_TITLE, sep='')
@@ -498,9 +511,6 @@ class CourseSchedulerCli:
             print(f"  {i + 1}\t ", end='')
             for j in range(len(schedule_table)):
                 if schedule_table[j][i] is not None:
-                    if schedule_table[j][i].weeks & (2 ** weeks) == 0:
-                        print("[\t\t\t\t]", end='')
-                        continue
                     name = schedule_table[j][i].name
                     if name in ("现代CAD技术（A）", "现代CAD技术（B）", "数学分析II",
                                 "概率论与数理统计A"):
@@ -525,9 +535,6 @@ class CourseSchedulerCli:
             print("\n\t ", end='')
             for j in range(len(schedule_table)):
                 if schedule_table[j][i] is not None:
-                    if schedule_table[j][i].weeks & (2 ** weeks) == 0:
-                        print("[\t\t\t\t]", end='')
-                        continue
                     teacher = schedule_table[j][i].teacher
                     if teacher == "王长波教授、孙玉灵":
                         print(f"[     {teacher}\t]", end='')
@@ -550,6 +557,7 @@ class CourseSchedulerCli:
         """Call Checker.main() (with config)"""
         if config is None:
             config: Config = self.config
+        self.sv.flush()  # 等待后台写出完成,检查的是最新的方案
         checker.main(course_file=config.course_file,
                      schedule_file=config.schedule_file)
 
@@ -567,13 +575,41 @@ class CourseSchedulerCli:
         else:
             self.sv.dump_schedule(schedule_file=schedule_file)
 
-    def get_course_info(self, *, course_keyword: str) -> Dict[Course, Any]:
-        """Search courses by Keyword"""
-        return self.sv.get_course_info(course_keyword=course_keyword)
+    def compact_journal(self):
+        """Merge the edit journal (if any) into schedule file and wait
+        until it is written"""
+        self.sv.compact_journal()
+        self.sv.flush()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait for pending background schedule dumps
+
+        Returns:
+            bool:   False if timed out
+        """
+        return self.sv.flush(timeout)
+
+    def get_course_info(self,
+                        *,
+                        course_keyword: str,
+                        offset: int = 0,
+                        limit: int = None) -> Dict[Course, Any]:
+        """Search courses by Keyword, best matches first
+
+        Args:
+            offset, limit:  return results[offset:offset + limit]
+                            (all of the rest if limit is None)
+        """
+        return self.sv.get_course_info(course_keyword=course_keyword,
+                                       offset=offset,
+                                       limit=limit)
 
     def add_course(self, *, course_id: str = "", offer_id: str = "") -> int:
         """Add course into schedule table
 
+        A course already in the table switches to offer_id instead,
+        as update_course does.
+
         Returns:
             int:    status, must be one of the three:
             0:  success.
@@ -635,6 +671,12 @@ class CourseSchedulerCli:
             timelist.append(0)
         setattr(self.config, "forbid_time", timelist)
 
+    def count_available_courses(self, timelist: List[int] = None) -> int:
+        """Count courses having a class that avoids Forbid Time"""
+        if timelist is None:
+            timelist = self.config.forbid_time
+        return len(self.cs.available_courses(pack_times(timelist)))
+
     def config_toggle(self, attrname: str) -> bool:
         """Toggle Enable/Disable, will return primal value"""
         primal: bool = getattr(self.config, attrname)
@@ -0,0 +1,829 @@
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping, MutableMapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple, Union
+import glob
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+
+from .conflict import ConflictGraph
+from .jsonstream import iter_json_array
+from .search import Postings, SearchIndex
+from .timemask import (DAY_MASK, DAYS, SLOTS, WEEKS_MASK, pack_times,
+                       spread_mask)
+
+CACHE_MAGIC = b"CACATLG\0"
+CACHE_VERSION = 3
+_TYPECODES = "BHIiQd"
+# 文件头：魔数、版本、源文件大小、源文件修改时间(ns)、各类型码的字节宽度、段数
+_HEADER = struct.Struct(f"<8sIQQ{len(_TYPECODES)}sI")
+_SECTION = struct.Struct("<QQ")  # 段偏移、段长度
+
+SEASONS = ("Autumn", "Spring")  # 下标即学期奇偶：偶数秋季、奇数春季
+REQUIRED = ("Elective", "Compulsory")
+
+# 共享课程表登记：各文件的 (绝对路径, 内容摘要) -> 课程表；以及各路径最近一次的摘要
+_REGISTRY: Dict[Tuple[Tuple[str, bytes], ...], "CompactCatalog"] = {}
+_DIGESTS: Dict[str, Tuple[int, int, bytes]] = {}
+
+
+def _credit(value: float) -> Union[int, float]:
+    """学分以浮点数存放；为整数时还原为 int,与 course.json 中的写法一致"""
+    return int(value) if value.is_integer() else value
+
+
+class StringTable:
+    """紧凑字符串表：所有字符串以 UTF-8 拼接存放,另以偏移数组定位"""
+
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self, blob: bytes, offsets: array):
+        self.blob = blob
+        self.offsets = offsets  # 长度为 len+1,第i个串为 blob[offsets[i]:offsets[i+1]]
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> "StringTable":
+        offsets = array('I', [0])
+        chunks: List[bytes] = []
+        size = 0
+        for string in strings:
+            chunk = string.encode('utf-8')
+            chunks.append(chunk)
+            size += len(chunk)
+            offsets.append(size)
+        return cls(b"".join(chunks), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    @classmethod
+    def concat(cls, tables: Iterable["StringTable"]) -> "StringTable":
+        offsets = array('I', [0])
+        chunks: List[bytes] = []
+        for table in tables:
+            base = offsets[-1]
+            chunks.append(bytes(table.blob[:table.offsets[-1]]))
+            offsets.extend(offset + base for offset in table.offsets[1:])
+        return cls(b"".join(chunks), offsets)
+
+
+class OfferingView:
+    """CompactCatalog 中第 j 个教学班的只读视图,属性与 Offering 相同"""
+
+    __slots__ = ("_catalog", "_j")
+
+    def __init__(self, catalog: "CompactCatalog", j: int):
+        self._catalog = catalog
+        self._j = j
+
+    @property
+    def id(self) -> str:
+        return self._catalog.offer_ids[self._j]
+
+    @property
+    def teacher(self) -> str:
+        return self._catalog.teachers[self._j]
+
+    @property
+    def times(self) -> List[int]:
+        return list(self._catalog.times[self._j * DAYS:(self._j + 1) * DAYS])
+
+    @property
+    def weeks(self) -> int:
+        return self._catalog.weeks[self._j]
+
+    @property
+    def slot_mask(self) -> int:
+        return pack_times(self.times)
+
+    @property
+    def time_mask(self) -> int:
+        return spread_mask(self.slot_mask, self.weeks)
+
+    def __repr__(self):
+        return (f"Offering(id={self.id!r}, teacher={self.teacher!r}, "
+                f"times={self.times!r}, weeks={self.weeks!r})")
+
+
+class CourseView:
+    """CompactCatalog 中第 i 门课程的只读视图,属性与 Course 相同"""
+
+    __slots__ = ("_catalog", "_i")
+
+    def __init__(self, catalog: "CompactCatalog", i: int):
+        self._catalog = catalog
+        self._i = i
+
+    @property
+    def id(self) -> str:
+        return self._catalog.course_ids[self._i]
+
+    @property
+    def name(self) -> str:
+        return self._catalog.names[self._i]
+
+    @property
+    def credit(self) -> Union[int, float]:
+        return _credit(self._catalog.credits[self._i])
+
+    @property
+    def semester(self) -> str:
+        return SEASONS[self._catalog.seasons[self._i]]
+
+    @property
+    def required(self) -> str:
+        return REQUIRED[self._catalog.required[self._i]]
+
+    @property
+    def prerequisites(self) -> List[str]:
+        catalog = self._catalog
+        return [
+            catalog.prereq_name(k)
+            for k in catalog.prereq_idx[catalog.prereq_ptr[self._i]:catalog.
+                                        prereq_ptr[self._i + 1]]
+        ]
+
+    @property
+    def offerings(self) -> List[OfferingView]:
+        catalog = self._catalog
+        return [
+            OfferingView(catalog, j) for j in range(
+                catalog.offer_ptr[self._i], catalog.offer_ptr[self._i + 1])
+        ]
+
+    @property
+    def priority(self) -> int:
+        """课程表中声明的优先级；调度时的优先级见 CourseScheduler.priorities"""
+        return self._catalog.priorities[self._i]
+
+    def __eq__(self, other):
+        if isinstance(other, CourseView):
+            return (self._catalog is other._catalog and self._i == other._i)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return (f"Course(id={self.id!r}, name={self.name!r}, "
+                f"credit={self.credit!r}, priority={self.priority!r})")
+
+
+class LazyOfferings(Sequence):
+    """第 i 门课程的教学班列表,首次访问时才由课程表解码为 factory(**字段) 对象"""
+
+    __slots__ = ("_catalog", "_i", "_factory", "_items")
+
+    def __init__(self, catalog: "CompactCatalog", i: int, factory: Callable):
+        self._catalog = catalog
+        self._i = i
+        self._factory = factory
+        self._items: List[Any] = None
+
+    def _materialize(self) -> List[Any]:
+        if self._items is None:
+            catalog = self._catalog
+            self._items = [
+                self._factory(id=catalog.offer_ids[j],
+                              teacher=catalog.teachers[j],
+                              times=catalog.times[j * DAYS:(j + 1) *
+                                                  DAYS].tolist(),
+                              weeks=catalog.weeks[j])
+                for j in range(catalog.offer_ptr[self._i],
+                               catalog.offer_ptr[self._i + 1])
+            ]
+        return self._items
+
+    def __getitem__(self, index):
+        return self._materialize()[index]
+
+    def __len__(self) -> int:
+        if self._items is None:
+            return (self._catalog.offer_ptr[self._i + 1] -
+                    self._catalog.offer_ptr[self._i])
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._materialize())
+
+    def __eq__(self, other):
+        if isinstance(other, (list, LazyOfferings)):
+            return self._materialize() == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self._materialize())
+
+
+class CourseTeachers(Sequence):
+    """第 i 项为第 i 门课程各教学班去重后的教师,供检索索引核对"""
+
+    def __init__(self, catalog: "CompactCatalog"):
+        self._catalog = catalog
+
+    def __getitem__(self, i: int) -> Tuple[str, ...]:
+        catalog = self._catalog
+        return tuple(
+            dict.fromkeys(catalog.teachers[j]
+                          for j in range(catalog.offer_ptr[i],
+                                         catalog.offer_ptr[i + 1])))
+
+    def __len__(self) -> int:
+        return len(self._catalog.course_ids)
+
+
+class CourseTable(Mapping):
+    """课程id -> CourseView 的只读映射,可替代 Dict[str, Course]"""
+
+    def __init__(self, catalog: "CompactCatalog"):
+        self._catalog = catalog
+
+    def __getitem__(self, course_id: str) -> CourseView:
+        return CourseView(self._catalog, self._catalog.index[course_id])
+
+    def __contains__(self, course_id: Any) -> bool:
+        return course_id in self._catalog.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._catalog.index)
+
+    def __len__(self) -> int:
+        return len(self._catalog.index)
+
+
+class PriorityMap(MutableMapping):
+    """课程id -> 优先级 的可写映射,存放于独立的数组中,不修改课程表本身
+
+    只能修改已有课程的优先级,不能增删课程。
+    """
+
+    def __init__(self, catalog: "CompactCatalog", priorities: array):
+        self._catalog = catalog
+        self._priorities = priorities
+
+    def __getitem__(self, course_id: str) -> int:
+        return self._priorities[self._catalog.index[course_id]]
+
+    def __setitem__(self, course_id: str, priority: int):
+        self._priorities[self._catalog.index[course_id]] = priority
+
+    def __delitem__(self, course_id: str):
+        raise TypeError("Courses cannot be removed from a PriorityMap")
+
+    def __contains__(self, course_id: Any) -> bool:
+        return course_id in self._catalog.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._catalog.index)
+
+    def __len__(self) -> int:
+        return len(self._catalog.index)
+
+
+class HashIndex(Mapping):
+    """以开放寻址哈希表实现的 课程id -> 下标 映射,可直接存放在编译后的课程表文件中
+
+    slots 长度为2的幂,空位为 -1；哈希函数为 UTF-8 编码的 crc32,与进程无关。
+    """
+
+    def __init__(self, keys: StringTable, slots):
+        self.keys = keys
+        self.slots = slots
+
+    @classmethod
+    def build(cls, keys: StringTable) -> "HashIndex":
+        size = 1
+        while size < 2 * len(keys):
+            size <<= 1
+        slots = array('i', [-1]) * size
+        for i in range(len(keys)):
+            pos = zlib.crc32(keys[i].encode('utf-8')) & (size - 1)
+            while slots[pos] != -1:
+                pos = (pos + 1) & (size - 1)
+            slots[pos] = i
+        return cls(keys, slots)
+
+    def __getitem__(self, key: str) -> int:
+        if not isinstance(key, str):
+            raise KeyError(key)
+        size = len(self.slots)
+        pos = zlib.crc32(key.encode('utf-8')) & (size - 1)
+        while (i := self.slots[pos]) != -1:
+            if self.keys[i] == key:
+                return i
+            pos = (pos + 1) & (size - 1)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.keys[i] for i in range(len(self.keys)))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class CompactCatalog:
+    """结构数组形式的课程表：课程与教学班的各字段分别存放于类型化数组中
+
+    先修关系以 CSR 形式存放：第i门课的先修课为
+    prereq_idx[prereq_ptr[i]:prereq_ptr[i+1]],非负值为课程下标,
+    负值 -k-1 表示不在课程表中的第k个外部课程id。
+    第i门课的教学班为下标 offer_ptr[i] 至 offer_ptr[i+1]-1。
+    """
+
+    def __init__(self):
+        self.course_ids = StringTable.from_strings(())
+        self.names = StringTable.from_strings(())
+        self.credits = array('d')
+        self.seasons = array('B')  # 下标对应 SEASONS
+        self.required = array('B')  # 下标对应 REQUIRED
+        self.priorities = array('i')
+        self.prereq_ptr = array('I', [0])
+        self.prereq_idx = array('i')
+        self.external_ids = StringTable.from_strings(())
+        self.offer_ptr = array('I', [0])
+        self.offer_ids = StringTable.from_strings(())
+        self.teachers = StringTable.from_strings(())
+        self.times = array('H')  # 每个教学班7个13位位图
+        self.weeks = array('Q')
+        self.index: Dict[str, int] = {}  # 课程id -> 下标（或 HashIndex）
+        self.courses = CourseTable(self)
+        self.cache_file: str = None  # 从编译文件载入时,为该文件路径
+        self._mmap: mmap.mmap = None
+        # (课程id, 教学班id) -> 教学班下标,首次查询时建立
+        self._offering_index: Dict[Tuple[str, str], int] = None
+        self._slot_masks: List[int] = None  # 各教学班的压缩位图,首次查询时解码
+        self._conflict_graph: ConflictGraph = None  # 首次查询时建立
+        # 编译文件中存有检索索引,载入即可用；否则在调度器载入时建立
+        self._search_index: SearchIndex = None
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict[str, Any]]):
+        """由 course.json 中的课程条目构建
+
+        条目无法以类型化数组存放时（缺少字段、学期或必修取值未知、
+        weeks 超出64位、times 不是16位非负整数等）抛出 ValueError。
+        """
+        catalog = cls()
+        ids: List[str] = []
+        names: List[str] = []
+        prereqs: List[List[str]] = []
+        offer_ids: List[str] = []
+        teachers: List[str] = []
+        for entry in entries:
+            course_id = entry.get('id')
+            if entry.get('semester') not in SEASONS:
+                raise ValueError(f"Course {course_id!r}: semester must be one "
+                                 f"of {SEASONS}, got {entry.get('semester')!r}")
+            if entry.get('required') not in REQUIRED:
+                raise ValueError(f"Course {course_id!r}: required must be one "
+                                 f"of {REQUIRED}, got {entry.get('required')!r}")
+            try:
+                catalog.index[entry['id']] = len(ids)
+                ids.append(entry['id'])
+                names.append(entry['name'])
+                catalog.credits.append(entry['credit'])
+                catalog.seasons.append(SEASONS.index(entry['semester']))
+                catalog.required.append(REQUIRED.index(entry['required']))
+                catalog.priorities.append(entry.get('priority', 9))  # 默认优先级9
+                prereqs.append(entry.get('prerequisites', []))
+                for off in entry.get('offerings', []):
+                    if not 0 <= off['weeks'] <= WEEKS_MASK:
+                        raise ValueError(f"weeks {off['weeks']!r} of class "
+                                         f"{off['id']!r} is out of range")
+                    offer_ids.append(off['id'])
+                    teachers.append(off['teacher'])
+                    times = list(off['times'][:DAYS])
+                    times.extend([0] * (DAYS - len(times)))
+                    catalog.times.extend(times)
+                    catalog.weeks.append(off['weeks'])
+                catalog.offer_ptr.append(len(offer_ids))
+            except KeyError as e:
+                raise ValueError(
+                    f"Course {course_id!r}: missing field {e}") from None
+            except (TypeError, ValueError, OverflowError) as e:
+                raise ValueError(
+                    f"Course {course_id!r} cannot be compiled: {e}") from None
+
+        external: Dict[str, int] = {}
+        for course_prereqs in prereqs:
+            for prereq in course_prereqs:
+                k = catalog.index.get(prereq)
+                if k is None:
+                    k = -1 - external.setdefault(prereq, len(external))
+                catalog.prereq_idx.append(k)
+            catalog.prereq_ptr.append(len(catalog.prereq_idx))
+
+        catalog.course_ids = StringTable.from_strings(ids)
+        catalog.names = StringTable.from_strings(names)
+        catalog.external_ids = StringTable.from_strings(external)
+        catalog.offer_ids = StringTable.from_strings(offer_ids)
+        catalog.teachers = StringTable.from_strings(teachers)
+        return catalog
+
+    @classmethod
+    def merge(cls,
+              catalogs: Sequence["CompactCatalog"],
+              sources: Sequence[str] = None) -> "CompactCatalog":
+        """按顺序合并多个课程表（各自对应 sources 中的一个文件）
+
+        课程id重复时抛出 ValueError；某文件中的外部先修课若在其他文件中定义,
+        合并后指向该课程。
+        """
+        merged = cls()
+        bases: List[int] = []
+        for n, catalog in enumerate(catalogs):
+            bases.append(len(merged.index))
+            for i in range(len(catalog.course_ids)):
+                course_id = catalog.course_ids[i]
+                if course_id in merged.index:
+                    first = bisect_right(bases, merged.index[course_id]) - 1
+                    where = (f" in {sources[first]} and {sources[n]}"
+                             if sources else "")
+                    raise ValueError(
+                        f"Duplicate course id {course_id!r}{where}")
+                merged.index[course_id] = len(merged.index)
+
+        external: Dict[str, int] = {}
+        for base, catalog in zip(bases, catalogs):
+            # 本课程表的外部先修课 -> 合并后 prereq_idx 中的取值
+            resolved = []
+            for k in range(len(catalog.external_ids)):
+                prereq = catalog.external_ids[k]
+                idx = merged.index.get(prereq)
+                if idx is None:
+                    idx = -1 - external.setdefault(prereq, len(external))
+                resolved.append(idx)
+            prereq_base = merged.prereq_ptr[-1]
+            merged.prereq_idx.extend(base + k if k >= 0 else resolved[-1 - k]
+                                     for k in catalog.prereq_idx)
+            merged.prereq_ptr.extend(ptr + prereq_base
+                                     for ptr in catalog.prereq_ptr[1:])
+            offer_base = merged.offer_ptr[-1]
+            merged.offer_ptr.extend(ptr + offer_base
+                                    for ptr in catalog.offer_ptr[1:])
+            for name in ("credits", "seasons", "required", "priorities",
+                         "times", "weeks"):
+                getattr(merged, name).frombytes(bytes(getattr(catalog, name)))
+
+        for name in ("course_ids", "names", "offer_ids", "teachers"):
+            setattr(merged, name,
+                    StringTable.concat(getattr(c, name) for c in catalogs))
+        merged.external_ids = StringTable.from_strings(external)
+        return merged
+
+    def iter_entries(self, offerings: bool = True
+                     ) -> Iterator[Dict[str, Any]]:
+        """按 course.json 的条目格式逐个还原课程；offerings 为假时省略教学班"""
+        offer_ptr, prereq_ptr = self.offer_ptr, self.prereq_ptr
+        times, weeks = self.times, self.weeks
+        for i in range(len(self.course_ids)):
+            entry = {
+                "id": self.course_ids[i],
+                "name": self.names[i],
+                "credit": _credit(self.credits[i]),
+                "semester": SEASONS[self.seasons[i]],
+                "required": REQUIRED[self.required[i]],
+                "prerequisites": [
+                    self.prereq_name(k) for k in
+                    self.prereq_idx[prereq_ptr[i]:prereq_ptr[i + 1]]
+                ],
+                "priority": self.priorities[i]
+            }
+            if offerings:
+                entry["offerings"] = [{
+                    "id": self.offer_ids[j],
+                    "teacher": self.teachers[j],
+                    "times": times[j * DAYS:(j + 1) * DAYS].tolist(),
+                    "weeks": weeks[j]
+                } for j in range(offer_ptr[i], offer_ptr[i + 1])]
+            yield entry
+
+    def overlay(self) -> PriorityMap:
+        """以课程表中的优先级为初值的独立优先级映射：修改它不影响课程表本身"""
+        return PriorityMap(self, array('i', self.priorities))
+
+    def offering_index(self) -> Dict[Tuple[str, str], int]:
+        """(课程id, 教学班id) -> 教学班下标 j；同一课程中重复的教学班id取第一个"""
+        if self._offering_index is None:
+            index: Dict[Tuple[str, str], int] = {}
+            offer_ptr, offer_ids = self.offer_ptr, self.offer_ids
+            for i in range(len(self.course_ids)):
+                course_id = self.course_ids[i]
+                for j in range(offer_ptr[i], offer_ptr[i + 1]):
+                    index.setdefault((course_id, offer_ids[j]), j)
+            self._offering_index = index
+        return self._offering_index
+
+    def slot_masks(self) -> List[int]:
+        """全部教学班的压缩位图（天×节）,下标与教学班下标 j 相同"""
+        if self._slot_masks is None:
+            # 与逐个调用 pack_times 等价；直接展开7天,免去逐个切片与函数调用
+            m = DAY_MASK
+            days = [iter(self.times)] * DAYS
+            self._slot_masks = [
+                (d0 & m | (d1 & m) << SLOTS | (d2 & m) << 2 * SLOTS
+                 | (d3 & m) << 3 * SLOTS | (d4 & m) << 4 * SLOTS
+                 | (d5 & m) << 5 * SLOTS | (d6 & m) << 6 * SLOTS)
+                for d0, d1, d2, d3, d4, d5, d6 in zip(*days)
+            ]
+        return self._slot_masks
+
+    def conflict_graph(self) -> ConflictGraph:
+        """全部教学班的冲突图,下标与教学班下标 j 相同"""
+        if self._conflict_graph is None:
+            self._conflict_graph = ConflictGraph(self.slot_masks(),
+                                                 self.weeks)
+        return self._conflict_graph
+
+    def search_index(self) -> SearchIndex:
+        """按课程id、名称、教师检索的索引,下标与课程下标 i 相同（不解码教学班）
+
+        从编译文件载入时直接使用文件中的索引；否则在此建立。
+        """
+        if self._search_index is None:
+            offer_ptr, teachers = self.offer_ptr, self.teachers
+            self._search_index = SearchIndex.build(
+                self.course_ids, self.names,
+                ((teachers[j] for j in range(offer_ptr[i], offer_ptr[i + 1]))
+                 for i in range(len(self.course_ids))))
+        return self._search_index
+
+    def prereq_name(self, k: int) -> str:
+        """prereq_idx 中的取值 -> 课程id"""
+        return self.course_ids[k] if k >= 0 else self.external_ids[-1 - k]
+
+    # 编译文件中各段的顺序：(属性名, 类型码)；StringTable 占 blob 与 offsets 两段
+    _STRINGS = ("course_ids", "names", "external_ids", "offer_ids", "teachers")
+    _ARRAYS = (("credits", 'd'), ("seasons", 'B'), ("required", 'B'),
+               ("priorities", 'i'), ("prereq_ptr", 'I'), ("prereq_idx", 'i'),
+               ("offer_ptr", 'I'), ("times", 'H'), ("weeks", 'Q'))
+
+    def save(self, cache_file: str, source_file: str):
+        """写出编译后的课程表文件（先写临时文件再替换）,以源文件的大小与修改时间标记版本"""
+        index = self.index if isinstance(self.index, HashIndex) \
+            else HashIndex.build(self.course_ids)
+        sections: List[bytes] = []
+        for name in self._STRINGS:
+            table: StringTable = getattr(self, name)
+            sections.append(bytes(table.blob))
+            sections.append(bytes(table.offsets))
+        for name, _typecode in self._ARRAYS:
+            sections.append(bytes(getattr(self, name)))
+        sections.append(bytes(index.slots))
+        # 其后为检索索引：后缀数组两段、倒排表的字组（blob、offsets）与 CSR 两段
+        search = self.search_index()
+        grams = StringTable.from_strings(search._postings.grams)
+        for part in (search._suffix_course, search._suffix_start, grams.blob,
+                     grams.offsets, search._postings.ptr,
+                     search._postings.idx):
+            sections.append(bytes(part))
+
+        stat = os.stat(source_file)
+        sizes = bytes(array(t).itemsize for t in _TYPECODES)
+        offset = _HEADER.size + _SECTION.size * len(sections)
+        table_of_contents = []
+        for section in sections:
+            offset += -offset % 8  # 各段按8字节对齐
+            table_of_contents.append(_SECTION.pack(offset, len(section)))
+            offset += len(section)
+
+        # 临时文件名各不相同：多个进程同时编译时互不覆盖,最后替换者生效
+        fd, tmp_file = tempfile.mkstemp(
+            prefix=os.path.basename(cache_file) + ".",
+            suffix=".tmp",
+            dir=os.path.dirname(cache_file) or ".")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(
+                    _HEADER.pack(CACHE_MAGIC, CACHE_VERSION, stat.st_size,
+                                 stat.st_mtime_ns, sizes, len(sections)))
+                f.write(b"".join(table_of_contents))
+                for section in sections:
+                    f.write(b"\0" * (-f.tell() % 8))
+                    f.write(section)
+            os.replace(tmp_file, cache_file)
+        except BaseException:
+            os.unlink(tmp_file)
+            raise
+
+    @classmethod
+    def load(cls, cache_file: str, source_file: str = None):
+        """内存映射编译后的课程表文件；文件无效或与源文件不符时返回 None
+
+        各数组均为映射上的只读 memoryview,载入时间与课程表规模无关。
+        """
+        try:
+            with open(cache_file, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mm) < _HEADER.size:
+            return None
+        magic, version, src_size, src_mtime, sizes, count = \
+            _HEADER.unpack_from(mm, 0)
+        if (magic != CACHE_MAGIC or version != CACHE_VERSION
+                or sizes != bytes(array(t).itemsize for t in _TYPECODES)):
+            return None
+        if source_file is not None:
+            try:
+                stat = os.stat(source_file)
+            except OSError:
+                return None
+            if (stat.st_size, stat.st_mtime_ns) != (src_size, src_mtime):
+                return None
+
+        # 段表越界或段长不合类型宽度（文件被截断或损坏）时同样视为无效
+        view = memoryview(mm)
+        sections = []
+        catalog = cls()
+        try:
+            for k in range(count):
+                offset, length = _SECTION.unpack_from(
+                    mm, _HEADER.size + k * _SECTION.size)
+                if offset + length > len(mm):
+                    return None
+                sections.append(view[offset:offset + length])
+            pos = 0
+            for name in cls._STRINGS:
+                setattr(catalog, name,
+                        StringTable(sections[pos], sections[pos + 1].cast('I')))
+                pos += 2
+            for name, typecode in cls._ARRAYS:
+                setattr(catalog, name, sections[pos].cast(typecode))
+                pos += 1
+            catalog.index = HashIndex(catalog.course_ids,
+                                      sections[pos].cast('i'))
+            pos += 1
+            grams = StringTable(sections[pos + 2], sections[pos + 3].cast('I'))
+            catalog._search_index = SearchIndex(
+                catalog.course_ids, catalog.names, CourseTeachers(catalog),
+                sections[pos].cast('I'), sections[pos + 1].cast('I'),
+                Postings(grams, sections[pos + 4].cast('I'),
+                         sections[pos + 5].cast('I')))
+        except (TypeError, ValueError, IndexError, struct.error):
+            return None
+        catalog.cache_file = cache_file
+        catalog._mmap = mm
+        return catalog
+
+    def __getstate__(self):
+        if self.cache_file is None:
+            state = self.__dict__.copy()
+            del state["_mmap"]
+            state["_offering_index"] = None  # 可重建,不必传输
+            state["_slot_masks"] = None
+            state["_conflict_graph"] = None
+            state["_search_index"] = None
+            return state
+        # 映射文件不能序列化：只传文件路径
+        return {"cache_file": self.cache_file}
+
+    def __setstate__(self, state):
+        if "_mmap" not in state and state.get("cache_file") is not None:
+            loaded = CompactCatalog.load(state["cache_file"])
+            state = dict(loaded.__dict__)
+            state["courses"] = CourseTable(self)
+        self.__dict__.update(state)
+        self.__dict__.setdefault("_mmap", None)
+
+
+def catalog_cache_path(course_file: str) -> str:
+    """course.json 对应的编译文件路径（同目录、扩展名 .catalog）"""
+    return os.path.splitext(course_file)[0] + ".catalog"
+
+
+def compile_catalog(course_file: str, cache_file: str = None
+                    ) -> CompactCatalog:
+    """将 course.json 编译为二进制课程表文件,返回编译得到的课程表"""
+    if cache_file is None:
+        cache_file = catalog_cache_path(course_file)
+    catalog = CompactCatalog.from_entries(iter_json_array(course_file))
+    try:
+        catalog.save(cache_file, course_file)
+    except OSError:
+        pass  # 无法写出编译文件时（如只读目录）仍可使用本次解析结果
+    return catalog
+
+
+def load_compact_catalog(course_file: str, *, cache: bool = True
+                         ) -> CompactCatalog:
+    """优先内存映射有效的编译文件,否则解析 course.json 并重新编译"""
+    if not cache:
+        return CompactCatalog.from_entries(iter_json_array(course_file))
+    catalog = CompactCatalog.load(catalog_cache_path(course_file), course_file)
+    if catalog is None:
+        catalog = compile_catalog(course_file)
+    return catalog
+
+
+def resolve_course_files(course_file: Union[str, Sequence[str]]
+                         ) -> List[str]:
+    """course_file 可为单个路径、glob 模式或它们的列表,返回各课程文件的路径
+
+    glob 模式按文件名排序展开,没有匹配时抛出 FileNotFoundError；重复的文件只保留一次。
+    """
+    patterns = [course_file] if isinstance(course_file, str) else course_file
+    files: List[str] = []
+    seen = set()
+    for pattern in patterns:
+        if any(c in pattern for c in "*?["):
+            matched = sorted(glob.glob(pattern))
+            if not matched:
+                raise FileNotFoundError(2, "No such file or directory",
+                                        pattern)
+        else:
+            matched = [pattern]
+        for path in matched:
+            if os.path.realpath(path) not in seen:
+                seen.add(os.path.realpath(path))
+                files.append(path)
+    return files
+
+
+def _load_one(course_file: str, cache: bool) -> CompactCatalog:
+    """进程池中载入单个课程文件；已写出编译文件时只回传其路径（见 __getstate__）"""
+    catalog = load_compact_catalog(course_file, cache=cache)
+    if cache and catalog.cache_file is None:
+        mapped = CompactCatalog.load(catalog_cache_path(course_file),
+                                     course_file)
+        if mapped is not None:
+            return mapped
+    return catalog
+
+
+def load_catalogs(course_files: Sequence[str],
+                  *,
+                  cache: bool = True,
+                  workers: int = None) -> CompactCatalog:
+    """载入多个课程文件并合并为一个课程表
+
+    编译文件有效的直接内存映射；其余文件在进程池中并发解析与编译,
+    总耗时取决于最大的那个文件。
+    """
+    catalogs: List[CompactCatalog] = [None] * len(course_files)
+    todo: List[int] = []
+    for n, course_file in enumerate(course_files):
+        if cache:
+            catalogs[n] = CompactCatalog.load(catalog_cache_path(course_file),
+                                              course_file)
+        if catalogs[n] is None:
+            todo.append(n)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if len(todo) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers,
+                                                 len(todo))) as pool:
+            futures = [
+                pool.submit(_load_one, course_files[n], cache) for n in todo
+            ]
+            for n, future in zip(todo, futures):
+                catalogs[n] = future.result()
+    else:
+        for n in todo:
+            catalogs[n] = load_compact_catalog(course_files[n], cache=cache)
+    if len(catalogs) == 1:
+        return catalogs[0]
+    return CompactCatalog.merge(catalogs, course_files)
+
+
+def content_digest(course_file: str) -> bytes:
+    """course.json 的内容摘要；文件大小与修改时间未变时复用上次结果"""
+    path = os.path.realpath(course_file)
+    st = os.stat(path)
+    memo = _DIGESTS.get(path)
+    if memo is not None and memo[:2] == (st.st_size, st.st_mtime_ns):
+        return memo[2]
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    _DIGESTS[path] = (st.st_size, st.st_mtime_ns, digest.digest())
+    return _DIGESTS[path][2]
+
+
+def shared_catalog(course_file: Union[str, Sequence[str]],
+                   *,
+                   cache: bool = True) -> CompactCatalog:
+    """按各文件的 (路径, 内容摘要) 共享的课程表：同样的课程文件在进程内只载入一次
+
+    course_file 的写法见 resolve_course_files；多个文件时载入后合并。
+    返回的课程表由各组件共用,应视为只读；需要修改优先级时使用 overlay()。
+    """
+    course_files = resolve_course_files(course_file)
+    paths = tuple(os.path.realpath(path) for path in course_files)
+    key = tuple((path, content_digest(path)) for path in paths)
+    catalog = _REGISTRY.get(key)
+    if catalog is None:
+        for stale in [k for k in _REGISTRY if tuple(p for p, _d in k) == paths]:
+            del _REGISTRY[stale]  # 同一组文件的旧内容不再使用
+        catalog = load_catalogs(course_files, cache=cache)
+        _REGISTRY[key] = catalog
+    return catalog
@@ -0,0 +1,84 @@
+from typing import Dict, Iterable, Iterator, List, Sequence
+
+from .timemask import SLOTS, WEEK_BITS, WEEKS_MASK
+
+WEEK_COUNT = 64  # weeks 位图的宽度
+_UNION_CACHE = 256  # 每种 weeks 取值的桶并集缓存上限
+
+
+def bitset(indices: Iterable[int], n: int) -> int:
+    """下标集合 -> n 位的位集（一次构造,避免逐位修改大整数）"""
+    buf = bytearray((n + 7) // 8)
+    for j in indices:
+        buf[j >> 3] |= 1 << (j & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def iter_bits(bitset: int) -> Iterator[int]:
+    """按升序给出位集中为1的位的下标（在 bin() 串上查找,不逐位移动大整数）"""
+    bits = bin(bitset)[:1:-1]  # 去掉 "0b" 并倒序：第k个字符即第k位
+    k = bits.find("1")
+    while k >= 0:
+        yield k
+        k = bits.find("1", k + 1)
+
+
+class ConflictGraph:
+    """教学班冲突图：neighbors(j) 为与第 j 个教学班时间冲突的教学班下标位集
+
+    两个教学班冲突,当且仅当二者的压缩位图（天×节）相交且上课周相交。
+    建图时按 (天, 节) 与按周分别分桶,每个桶是一个教学班位集；
+    某教学班的邻居即其所占各 (天, 节) 桶之并与其各周桶之并的交集,
+    只在查询时计算,不做两两比较。
+    两类桶同时是 (周, 天, 节) -> 教学班位集的倒排索引,见 at 与 meeting。
+    """
+
+    def __init__(self, slot_masks: Sequence[int], weeks: Sequence[int]):
+        self.slot_masks = slot_masks
+        self.weeks = weeks
+        n = len(slot_masks)
+        slot_members: List[List[int]] = [[] for _ in range(WEEK_BITS)]
+        week_members: List[List[int]] = [[] for _ in range(WEEK_COUNT)]
+        for j in range(n):
+            for bit in iter_bits(slot_masks[j]):
+                slot_members[bit].append(j)
+            for bit in iter_bits(weeks[j] & WEEKS_MASK):
+                week_members[bit].append(j)
+        self._slot_buckets = [bitset(m, n) for m in slot_members]
+        self._week_buckets = [bitset(m, n) for m in week_members]
+        self._week_unions: Dict[int, int] = {}  # weeks -> 各周桶之并
+
+    def __len__(self) -> int:
+        return len(self.slot_masks)
+
+    def _week_union(self, weeks: int) -> int:
+        union = self._week_unions.get(weeks)
+        if union is None:
+            union = 0
+            for bit in iter_bits(weeks & WEEKS_MASK):
+                union |= self._week_buckets[bit]
+            if len(self._week_unions) >= _UNION_CACHE:
+                self._week_unions.clear()
+            self._week_unions[weeks] = union
+        return union
+
+    def at(self, week: int, day: int, slot: int) -> int:
+        """第 week 周第 day 天第 slot 节有课的教学班位集"""
+        return (self._slot_buckets[day * SLOTS + slot]
+                & self._week_buckets[week])
+
+    def meeting(self, slot_mask: int, weeks: int = None) -> int:
+        """在 slot_mask（压缩位图）的任一 (天, 节) 上有课的教学班位集
+
+        给出 weeks 时只计在这些周内有课的教学班。
+        """
+        result = 0
+        for bit in iter_bits(slot_mask):
+            result |= self._slot_buckets[bit]
+        if weeks is not None and result:
+            result &= self._week_union(weeks)
+        return result
+
+    def neighbors(self, j: int) -> int:
+        """与第 j 个教学班冲突的教学班位集（不含 j 本身）"""
+        return self.meeting(self.slot_masks[j], self.weeks[j]) & ~(1 << j)
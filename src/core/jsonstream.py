@@ -0,0 +1,80 @@
+from typing import Any, Iterator
+import json
+
+CHUNK_SIZE = 1 << 16  # 每次读入的字符数
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",]"
+
+
+def iter_json_array(path: str, *, chunk_size: int = CHUNK_SIZE
+                    ) -> Iterator[Any]:
+    """逐个产出顶层 JSON 数组中的元素,不把整个文档读入内存
+
+    文件按块读入,用 JSONDecoder.raw_decode 从缓冲区中解码一个元素,
+    已解码部分随即丢弃；内存占用只与单个元素的大小成正比。
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def more(at_least: int = 0) -> bool:
+            """丢弃已解码部分并读入下一块,文件结束时返回 False"""
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            chunk = f.read(max(chunk_size, at_least))
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_ws() -> str:
+            """跳过空白,返回下一个字符（文件结束时为空串）"""
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buf) or not more():
+                    return buf[pos:pos + 1]
+
+        if skip_ws() == "﻿":  # 兼容带 BOM 的文件
+            pos += 1
+        if skip_ws() != "[":
+            raise json.JSONDecodeError("Expecting '['", buf, pos)
+        pos += 1
+        if skip_ws() == "]":
+            pos += 1
+            if skip_ws():
+                raise json.JSONDecodeError("Extra data", buf, pos)
+            return
+        while True:
+            skip_ws()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    # 元素跨块：至少再读入缓冲区当前大小,避免平方级重试
+                    if more(len(buf) - pos):
+                        continue
+                    raise
+                # 数字等元素止于缓冲区末尾或非分隔符处时可能尚未读完
+                if (end == len(buf) or buf[end] not in _DELIMITERS
+                    ) and more(len(buf) - pos):
+                    continue
+                break
+            pos = end
+            yield value
+            sep = skip_ws()
+            pos += 1
+            if sep == "]":
+                if skip_ws():
+                    raise json.JSONDecodeError("Extra data", buf, pos)
+                return
+            if sep != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buf,
+                                           pos - 1)
@@ -0,0 +1,120 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Mapping, Tuple
+import os
+import random
+
+if TYPE_CHECKING:
+    from .schedule_util import Course, CourseScheduler, Offering
+
+# 方案评分权重：学分、必修课数、各学期学分的均衡度（标准差,作为惩罚项）
+DEFAULT_SCORE_WEIGHTS: Dict[str, float] = {
+    "credits": 1.0,
+    "required": 1.0,
+    "balance": 0.0,
+}
+
+_worker_scheduler: "CourseScheduler" = None  # 每个工作进程持有一份课程表
+
+
+def _init_worker(scheduler: "CourseScheduler"):
+    global _worker_scheduler
+    _worker_scheduler = scheduler
+
+
+def score_plan(placements: List[Tuple["Course", "Offering", int]],
+               score_weights: Dict[str, float] = None) -> float:
+    """按 score_weights 为方案打分（越大越好）"""
+    weights = dict(DEFAULT_SCORE_WEIGHTS)
+    weights.update(score_weights or {})
+    credits = sum(course.credit for course, _o, _s in placements)
+    required = sum(course.required == "Compulsory"
+                   for course, _o, _s in placements)
+    per_sem = [0] * 8
+    for course, _o, semester in placements:
+        per_sem[semester] += course.credit
+    mean = credits / len(per_sem)
+    balance = (sum((c - mean)**2 for c in per_sem) / len(per_sem))**0.5
+    return (weights["credits"] * credits + weights["required"] * required -
+            weights["balance"] * balance)
+
+
+def perturbed_order(courses: List["Course"], priorities: Mapping[str, int],
+                    enable_required: bool, seed: int,
+                    jitter: float) -> List["Course"]:
+    """按 (必修, 优先级, -学分) 排序；seed 非0时为优先级加抖动并随机打破平局"""
+    rng = random.Random(seed)
+    if seed == 0:
+        return sorted(courses,
+                      key=lambda c: (0 if enable_required and c.required ==
+                                     "Compulsory" else 1, priorities[c.id],
+                                     -c.credit))
+    keys = {
+        c.id: (0 if enable_required and c.required == "Compulsory" else 1,
+               priorities[c.id] + rng.uniform(-jitter, jitter), -c.credit,
+               rng.random())
+        for c in courses
+    }
+    return sorted(courses, key=lambda c: keys[c.id])
+
+
+def _run_start(seed: int, jitter: float, score_weights: Dict[str, float],
+               greedy_args: Tuple, greedy_kwargs: Dict):
+    scheduler = _worker_scheduler
+    order = perturbed_order(list(scheduler.courses.values()),
+                            scheduler.priorities,
+                            greedy_kwargs["enable_required"], seed, jitter)
+    placements = scheduler._schedule_greedy(order, *greedy_args,
+                                            **greedy_kwargs)
+    return (score_plan(placements, score_weights), seed,
+            [(course.id, off.id, sem) for course, off, sem in placements])
+
+
+def multistart(scheduler: "CourseScheduler",
+               min_credits: int,
+               course_lower_limit: int,
+               *,
+               enable_required: bool,
+               credit_limit_per_sem: int,
+               restarts: int = 64,
+               workers: int = None,
+               seed: int = 0,
+               jitter: float = 1.0,
+               score_weights: Dict[str, float] = None
+               ) -> List[Tuple["Course", "Offering", int]]:
+    """多起点随机贪心：在进程池中运行 restarts 次扰动排序的贪心,取得分最高的方案
+
+    课程表通过进程池的 initializer 每个工作进程只传递一次；
+    第一个起点不加扰动,因此结果不劣于普通贪心（按同一评分）。
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    seeds = [0] + [seed * restarts + k for k in range(1, restarts)]
+    greedy_args = (min_credits, course_lower_limit)
+    greedy_kwargs = {
+        "enable_required": enable_required,
+        "credit_limit_per_sem": credit_limit_per_sem
+    }
+    if workers <= 1 or restarts <= 1:
+        _init_worker(scheduler)
+        results = [
+            _run_start(s, jitter, score_weights, greedy_args, greedy_kwargs)
+            for s in seeds
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(scheduler, )) as pool:
+            futures = [
+                pool.submit(_run_start, s, jitter, score_weights,
+                            greedy_args, greedy_kwargs) for s in seeds
+            ]
+            results = [future.result() for future in futures]
+
+    # 得分相同时取种子较小者,保证结果可复现
+    _score, _seed, best = max(results, key=lambda r: (r[0], -r[1]))
+    placements = []
+    for course_id, class_id, semester in best:
+        placements.append((scheduler.courses[course_id],
+                           scheduler.get_offering(course_id, class_id),
+                           semester))
+    return placements
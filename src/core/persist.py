@@ -0,0 +1,134 @@
+from threading import Condition, Thread
+from typing import Any, Dict, List, Tuple
+import atexit
+import json
+import os
+import stat
+import tempfile
+
+
+class PersistWorker:
+    """在后台线程中写出 schedule.json 快照
+
+    同一文件尚未写出的快照被新快照替换（连续的修改只写一次）；
+    写出时先写临时文件再替换。快照登记时记下修改日志的长度,
+    写出后只截去这一部分,之后追加的记录保留。
+    修改日志的追加与截断都在 lock 下进行。
+    """
+
+    def __init__(self):
+        self.lock = Condition()
+        # schedule_file -> (快照条目, 修改日志路径, 需截去的日志字节数)
+        self._pending: Dict[str, Tuple[List[Dict[str, Any]], str, int]] = {}
+        self._busy = False
+        self._error: Exception = None
+        self._thread: Thread = None
+
+    def submit(self,
+               schedule_file: str,
+               entries: List[Dict[str, Any]],
+               journal_file: str = None):
+        """登记一份待写出的快照；journal_file 中现有的记录将在写出后截去"""
+        with self.lock:
+            offset = 0
+            if journal_file is not None and os.path.exists(journal_file):
+                offset = os.path.getsize(journal_file)
+            self._pending[schedule_file] = (entries, journal_file, offset)
+            if self._thread is None:
+                self._thread = Thread(target=self._run,
+                                      name="schedule-persist",
+                                      daemon=True)
+                self._thread.start()
+            self.lock.notify_all()
+
+    def append(self, journal_file: str, line: str):
+        """向修改日志追加一行"""
+        with self.lock:
+            with open(journal_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def flush(self, timeout: float = None) -> bool:
+        """等待已登记的快照全部写出；后台写出失败时在此抛出异常
+
+        超时返回 False。
+        """
+        with self.lock:
+            done = self.lock.wait_for(
+                lambda: not self._pending and not self._busy, timeout)
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+        return done
+
+    def _run(self):
+        while True:
+            with self.lock:
+                if not self._pending:
+                    self._thread = None  # 空闲时退出,下次登记时重新启动
+                    return
+                schedule_file, (entries, journal_file,
+                                offset) = self._pending.popitem()
+                self._busy = True
+            try:
+                write_json_atomic(schedule_file, entries)
+                if journal_file is not None:
+                    with self.lock:
+                        self._trim(journal_file, offset)
+            except Exception as e:
+                with self.lock:
+                    self._error = e
+            finally:
+                with self.lock:
+                    self._busy = False
+                    self.lock.notify_all()
+
+    def _trim(self, journal_file: str, offset: int):
+        """截去修改日志的前 offset 字节（调用者持有 lock）"""
+        if not os.path.exists(journal_file) or offset == 0:
+            return
+        size = os.path.getsize(journal_file)
+        offset = min(offset, size)
+        if offset == size:
+            os.remove(journal_file)
+        else:
+            with open(journal_file, 'rb') as f:
+                f.seek(offset)
+                rest = f.read()
+            _replace_file(journal_file, rest)
+        # 在截断之前登记的快照,其日志偏移相应前移
+        for schedule_file, (entries, pending_journal,
+                            pending_offset) in self._pending.items():
+            if pending_journal == journal_file:
+                self._pending[schedule_file] = (entries, pending_journal,
+                                                max(0, pending_offset - offset))
+
+
+def _replace_file(path: str, content: bytes):
+    """先写同目录下的临时文件再替换,写出失败时删除临时文件
+
+    临时文件名各不相同（同 CompactCatalog.save）：多个进程同时写出同一文件时互不覆盖,
+    最后替换者生效。已有文件的权限保留不变。
+    """
+    fd, tmp_file = tempfile.mkstemp(prefix=os.path.basename(path) + ".",
+                                    suffix=".tmp",
+                                    dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        if os.path.exists(path):
+            os.chmod(tmp_file, stat.S_IMODE(os.stat(path).st_mode))
+        os.replace(tmp_file, path)
+    except BaseException:
+        os.unlink(tmp_file)
+        raise
+
+
+def write_json_atomic(path: str, data: Any):
+    """先写临时文件再替换,中途崩溃不会留下写了一半的文件"""
+    _replace_file(
+        path,
+        json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+PERSIST_WORKER = PersistWorker()  # 进程内共用,同一文件的快照得以合并
+atexit.register(PERSIST_WORKER.flush)
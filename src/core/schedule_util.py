@@ -1,12 +1,27 @@
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Set
+from bisect import bisect_right, insort
+from collections import deque
+from typing import (Any, Dict, List, MutableMapping, Sequence, Set, Tuple,
+                    Union)
 import json
+import os
+
+from .catalog import (SEASONS, CompactCatalog, LazyOfferings,
+                      resolve_course_files, shared_catalog)
+from .conflict import ConflictGraph, iter_bits
+from .jsonstream import iter_json_array
+from .multistart import multistart
+from .persist import PERSIST_WORKER, PersistWorker
+from .search import SearchIndex
+from .solver import BranchAndBound, ConstraintSolver
+from .timemask import is_time_conflict, iter_slots, pack_times, spread_mask
 
 COURSE_FILE = "data\\course.json"
 SCHEDULE_FILE = "data\\schedule.json"
+JOURNAL_LIMIT = 256  # 日志累积到该条数时自动合并进 schedule.json
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Offering:
     id: str
     teacher: str
@@ -14,10 +29,27 @@ class Offering:
     # 每周7天上课时间位图（13位二进制表示一天内13节课）:
     # contentReference[oaicite:1]{index=1}
     weeks: int
+    # times 的压缩形式（7天×13节 = 91位）,用于禁排时间检测
+    slot_mask: int = field(init=False, repr=False, compare=False, default=0)
 
+    def __post_init__(self):
+        object.__setattr__(self, "slot_mask", pack_times(self.times))
 
-@dataclass
+    @property
+    def time_mask(self) -> int:
+        """按 weeks 展开的 周×天×节 位图,用于课程间冲突检测（用时计算）"""
+        return spread_mask(self.slot_mask, self.weeks)
+
+    def __hash__(self):
+        return hash((self.id, self.weeks, self.slot_mask))
+
+
+@dataclass(frozen=True, slots=True, eq=False)
 class Course:
+    """课程（不可变）；以 id 判等,哈希值在构造时算好
+
+    调度时可修改的优先级存放在 CourseScheduler.priorities 中。
+    """
     id: str
     name: str
     credit: int
@@ -25,21 +57,109 @@ class Course:
     required: str  # "Compulsory" 或 "Elective"
     prerequisites: List[str]
     offerings: List[Offering]
-    priority: int = field(default=9)  # 优先级,缺省为9
+    priority: int = field(default=9)  # 课程表中声明的优先级,缺省为9
+    _hash: int = field(init=False, repr=False, default=0)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_hash", hash(self.id))
+
+    def __eq__(self, other):
+        if isinstance(other, Course):
+            return self.id == other.id
+        return NotImplemented
 
     def __hash__(self):
-        return id.__hash__()
+        return self._hash
+
+
+@dataclass
+class _SemesterState:
+    """贪心排课在某学期开始时的状态,用于增量重排"""
+    in_degree: Dict[str, int]  # 各课程尚未修完的先修课数
+    ready: Dict[str, List[str]]  # 各季节就绪队列中的课程id
+    credit_accum: int  # 此前累计学分
+    placed: int  # 此前已选课程数
+
+
+@dataclass
+class SchedulePlan:
+    """schedule_courses 的结果：已选课程按学期给出 (课程, 班级, 学期),其余课程未选"""
+    placements: List[Tuple[Course, Offering, int]]
+    unscheduled: List[Course]
+
+    def to_json(self) -> List[Dict[str, Any]]:
+        """转换为 schedule.json 的格式（未选课程 semester=-1, class_id=""）"""
+        schedule = [{
+            "class_id": offering.id,
+            "course_id": course.id,
+            "semester": semester_idx
+        } for course, offering, semester_idx in self.placements]
+        schedule.extend({
+            "class_id": "",
+            "course_id": course.id,
+            "semester": -1
+        } for course in self.unscheduled)
+        return schedule
+
+    def dump(self, schedule_file: str = SCHEDULE_FILE):
+        """输出到 schedule.json"""
+        # 格式参见要求:contentReference[oaicite:7]{index=7}
+        with open(schedule_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f, ensure_ascii=False, indent=2)
 
 
 class CourseScheduler:
 
-    def __init__(self, *, course_file: str = COURSE_FILE):
-        with open(course_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    def __init__(self,
+                 *,
+                 course_file: Union[str, List[str]] = COURSE_FILE,
+                 compact: bool = False,
+                 cache: bool = True,
+                 lazy: bool = True):
+        """compact 为真时以 CompactCatalog（类型化数组）存放课程表,
+
+        self.courses 中的课程与教学班是数组上的视图,节省大课程表的内存。
+        cache 为真时通过内存映射读取 course.json 的编译文件（见 catalog.py）,
+        编译文件缺失或过期时自动重新编译,不再重复解析 JSON；
+        cache 为假时流式解析 course.json,每条课程直接转换为内部结构。
+        课程表经 shared_catalog 在各组件间共享,本调度器的优先级另存一份。
+        course_file 可为路径、glob 模式或它们的列表（如按院系拆分的课程文件）,
+        各文件并发编译后合并；不同文件中的课程id重复时抛出 ValueError。
+        lazy 为真（且使用编译文件）时只预先构建课程本身,
+        各课程的 offerings 在首次访问时才由编译文件解码,只查询课程信息时启动更快。
+        课程条目无法编译（见 CompactCatalog.from_entries）时,
+        compact 为真则抛出 ValueError,否则退回流式解析。
+        """
         self.courses: Dict[str, Course] = {}
+        # 调度用的优先级（课程id -> 优先级）,初值为课程表中声明的优先级
+        self.priorities: MutableMapping[str, int] = {}
         self.all_required = 0
-        for entry in data:
-            offerings = [Offering(**off) for off in entry.get('offerings', [])]
+        self.catalog: CompactCatalog = None
+        if compact or cache:
+            try:
+                self.catalog = shared_catalog(course_file, cache=cache)
+            except ValueError:
+                if compact:
+                    raise
+        if self.catalog is not None:
+            catalog = self.catalog
+            if compact:
+                self.courses = catalog.courses
+                self.priorities = catalog.overlay()
+                self.all_required = sum(catalog.required)
+            lazy = lazy and not compact
+            data = [] if compact else catalog.iter_entries(offerings=not lazy)
+        else:
+            # 逐条解析,不整体载入
+            data = self._iter_course_files(resolve_course_files(course_file))
+            lazy = False
+        for i, entry in enumerate(data):
+            if lazy:
+                offerings = LazyOfferings(catalog, i, Offering)
+            else:
+                offerings = [
+                    Offering(**off) for off in entry.get('offerings', [])
+                ]
             priority = entry.get('priority', 9)  # 默认优先级9
             course = Course(id=entry['id'],
                             name=entry['name'],
@@ -50,103 +170,357 @@ class CourseScheduler:
                             offerings=offerings,
                             priority=priority)
             self.courses[course.id] = course
+            self.priorities[course.id] = priority
             self.all_required += 1 if course.required == "Compulsory" else 0
         # 全局禁排时间位图（7天,每天13节课）:contentReference[oaicite:2]{index=2}。0表示不禁排。
         self.forbidden_times = [0] * 7
+        self.forbidden_mask = 0
+        # 最近一次精确搜索（含结点数等统计）
+        self.last_solver: BranchAndBound | ConstraintSolver = None
+        # 最近一次贪心排课的参数、结果与每学期开始时的状态；
+        # _dirty_semester 为其后输入变化最早影响到的学期,None 表示未受影响
+        self._greedy_args: Tuple = None
+        self._greedy_placements: List[Tuple[Course, Offering, int]] = []
+        self._greedy_trace: List[_SemesterState] = []
+        self._dirty_semester: int = None
+        # 后续课程表：先修课id -> 以其为先修课的课程id
+        self.dependents: Dict[str, List[str]] = {}
         for course in self.courses.values():
-            self._check_course_priority(course)
+            for prereq in set(course.prerequisites):
+                self.dependents.setdefault(prereq, []).append(course.id)
+        self._propagate_priorities()
+        # 不经编译文件载入时的 (课程id, 教学班id) -> 教学班,首次查询时建立
+        self._offering_index: Dict[Tuple[str, str], Offering] = None
+        # 不经编译文件载入时的 (冲突图, 各课程教学班起始下标, 课程id),首次查询时建立
+        self._time_index: Tuple[ConflictGraph, List[int], List[str]] = None
+        self._search_index: SearchIndex = None  # 不经编译文件载入时的检索索引
+        # 检索索引在载入时建立（编译文件中已存有的直接使用）,首次检索不必等待
+        self.search_index()
+
+    def get_offering(self, course_id: str, class_id: str) -> Offering:
+        """按 (课程id, 教学班id) 查找教学班,不存在时返回 None"""
+        catalog = self.catalog
+        if catalog is not None:
+            j = catalog.offering_index().get((course_id, class_id))
+            if j is None:
+                return None
+            first = catalog.offer_ptr[catalog.index[course_id]]
+            return self.courses[course_id].offerings[j - first]
+        if self._offering_index is None:
+            self._offering_index = {}
+            for course in self.courses.values():
+                for off in course.offerings:
+                    self._offering_index.setdefault((course.id, off.id), off)
+        return self._offering_index.get((course_id, class_id))
+
+    def time_index(self) -> Tuple[ConflictGraph, Sequence[int], Sequence[str]]:
+        """(冲突图, 各课程教学班起始下标, 课程id)：第 i 门课的教学班为 ptr[i] 至 ptr[i+1]-1
+
+        冲突图兼作 (周, 天, 节) -> 教学班位集的倒排索引；
+        使用编译文件时即课程表自身的冲突图。
+        """
+        catalog = self.catalog
+        if catalog is not None:
+            return (catalog.conflict_graph(), catalog.offer_ptr,
+                    catalog.course_ids)
+        if self._time_index is None:
+            ptr = [0]
+            slot_masks: List[int] = []
+            weeks: List[int] = []
+            for course in self.courses.values():
+                for off in course.offerings:
+                    slot_masks.append(off.slot_mask)
+                    weeks.append(off.weeks)
+                ptr.append(len(slot_masks))
+            self._time_index = (ConflictGraph(slot_masks, weeks), ptr,
+                                list(self.courses))
+        return self._time_index
+
+    def courses_meeting(self, slot_mask: int, weeks: int = None) -> Set[str]:
+        """有教学班在 slot_mask 的任一 (天, 节)（及 weeks 中某周）上课的课程id"""
+        graph, ptr, ids = self.time_index()
+        return {
+            ids[bisect_right(ptr, j) - 1]
+            for j in iter_bits(graph.meeting(slot_mask, weeks))
+        }
+
+    def available_courses(self, forbidden_mask: int = None) -> List[str]:
+        """至少有一个教学班避开禁排时间（缺省为当前设置）的课程id
+
+        界面每勾选一次禁排时间就调用一次,故逐个教学班与禁排位图按位与,
+        不为此建立冲突图。
+        """
+        if forbidden_mask is None:
+            forbidden_mask = self.forbidden_mask
+        courses: List[str] = []
+        catalog = self.catalog
+        if catalog is None:
+            for course_id, course in self.courses.items():
+                for off in course.offerings:
+                    if not off.slot_mask & forbidden_mask:
+                        courses.append(course_id)
+                        break
+            return courses
+        slot_masks, ptr, ids = (catalog.slot_masks(), catalog.offer_ptr,
+                                catalog.course_ids)
+        for i in range(len(ids)):
+            for j in range(ptr[i], ptr[i + 1]):
+                if not slot_masks[j] & forbidden_mask:
+                    courses.append(ids[i])
+                    break
+        return courses
+
+    def search_index(self) -> SearchIndex:
+        """按课程id、名称、教师检索课程的索引；使用编译文件时即课程表自身的索引"""
+        if self.catalog is not None:
+            return self.catalog.search_index()
+        if self._search_index is None:
+            self._search_index = SearchIndex.build(
+                list(self.courses),
+                [course.name for course in self.courses.values()],
+                ((off.teacher for off in course.offerings)
+                 for course in self.courses.values()))
+        return self._search_index
+
+    @staticmethod
+    def _iter_course_files(course_files: List[str]):
+        """依次流式读取各课程文件；不同文件中的课程id重复时抛出 ValueError"""
+        origin: Dict[str, str] = {}
+        for course_file in course_files:
+            for entry in iter_json_array(course_file):
+                first = origin.setdefault(entry['id'], course_file)
+                if first != course_file:
+                    raise ValueError(f"Duplicate course id {entry['id']!r} "
+                                     f"in {first} and {course_file}")
+                yield entry
 
     def schedule_courses(self,
                          min_credits: int,
                          course_lower_limit: int = 20,
                          *,
-                         schedule_file: str = SCHEDULE_FILE,
+                         schedule_file: str = None,
                          enable_required: bool = False,
-                         credit_limit_per_sem: int = 5000):
-        """生成满足至少 min_credits 的选课方案,并输出到 schedule.json。"""
-        completed: Set[str] = set()  # 已修课程ID
-        credit_accum = 0  # credit accummulation
-        semester_idx = 0  # 学期计数,从0开始,偶数秋季、奇数春季
-        sel_required = 0  # 已选必修课计数
-        schedule = []
+                         credit_limit_per_sem: int = 5000,
+                         strategy: str = "greedy",
+                         node_limit: int = 200000,
+                         time_limit: float = 5.0,
+                         restarts: int = 64,
+                         workers: int = None,
+                         seed: int = 0,
+                         score_weights: Dict[str, float] = None
+                         ) -> SchedulePlan:
+        """生成满足至少 min_credits 的选课方案。
+
+        仅当给出 schedule_file 时才输出到该文件；返回的 SchedulePlan
+        可直接交给 ScheduleVisualizer.adopt_plan,无需经过文件。
 
+        Args:
+            strategy:   "greedy": 按优先级逐学期贪心选课;
+                        "exact":  以贪心结果为初始解做分支限界搜索,
+                        在 node_limit / time_limit 预算内最大化必修课数与学分;
+                        "cp":     同样的目标,改用约束传播收缩取值域后搜索;
+                        "multistart": 在 workers 个进程中运行 restarts 次
+                        扰动排序的贪心,按 score_weights 取最优方案
+        """
         # 按优先级（升序）和学分（降序）预排序课程,方便每学期选课时依此选择
+        priorities = self.priorities
         sorted_courses = sorted(self.courses.values(),
                                 key=lambda c:
                                 (0 if enable_required and c.required ==
-                                 "Compulsory" else 1, c.priority, -c.credit))
+                                 "Compulsory" else 1, priorities[c.id],
+                                 -c.credit))
+
+        # 参数与上次相同时,只从受影响的第一个学期起重排
+        greedy_args = (min_credits, course_lower_limit, enable_required,
+                       credit_limit_per_sem)
+        if greedy_args != self._greedy_args:
+            resume = 0
+        elif self._dirty_semester is None:
+            resume = len(self._greedy_trace)
+        else:
+            resume = min(self._dirty_semester, len(self._greedy_trace))
+        if resume < len(self._greedy_trace) or resume == 0:
+            self._greedy_placements = self._schedule_greedy(
+                sorted_courses,
+                min_credits,
+                course_lower_limit,
+                enable_required=enable_required,
+                credit_limit_per_sem=credit_limit_per_sem,
+                trace=self._greedy_trace,
+                resume=resume)
+        self._greedy_args = greedy_args
+        self._dirty_semester = None
+        placements = self._greedy_placements[:]
+        if strategy in ("exact", "cp"):
+            options = dict(enable_required=enable_required,
+                           credit_limit_per_sem=credit_limit_per_sem,
+                           node_limit=node_limit,
+                           time_limit=time_limit)
+            if strategy == "exact":
+                self.last_solver = BranchAndBound(sorted_courses,
+                                                  self.forbidden_mask,
+                                                  **options)
+            else:
+                # 与检索共用教学班冲突图,不为每次求解重新建图
+                self.last_solver = ConstraintSolver(
+                    sorted_courses,
+                    self.forbidden_mask,
+                    time_index=self.time_index(),
+                    **options)
+            placements = self.last_solver.solve(incumbent=placements)
+        elif strategy == "multistart":
+            self.last_solver = None
+            placements = multistart(
+                self,
+                min_credits,
+                course_lower_limit,
+                enable_required=enable_required,
+                credit_limit_per_sem=credit_limit_per_sem,
+                restarts=restarts,
+                workers=workers,
+                seed=seed,
+                score_weights=score_weights)
+        elif strategy == "greedy":
+            self.last_solver = None
+        else:
+            raise ValueError(f"Unknown strategy: {strategy}")
+
+        # 记录排课结果：课程、所选班级、学期编号；未被选中的课程单独列出
+        completed: Set[str] = {course.id for course, _o, _s in placements}
+        plan = SchedulePlan(placements=placements,
+                            unscheduled=[
+                                course for course in sorted_courses
+                                if course.id not in completed
+                            ])
+        if schedule_file is not None:
+            plan.dump(schedule_file)
+        return plan
+
+    def _schedule_greedy(self,
+                         sorted_courses: List[Course],
+                         min_credits: int,
+                         course_lower_limit: int,
+                         *,
+                         enable_required: bool,
+                         credit_limit_per_sem: int,
+                         trace: List[_SemesterState] = None,
+                         resume: int = 0
+                         ) -> List[Tuple[Course, Offering, int]]:
+        """逐学期按 sorted_courses 的顺序贪心选课,返回 (课程, 班级, 学期) 列表
+
+        每个季节维护一个按 sorted_courses 顺序排列的就绪队列：
+        课程的先修课全部修完（入度减为0）后,于下一学期进入队列,
+        因此每学期只需遍历真正可选的课程。
+
+        给出 trace 时记录每学期开始时的状态；resume > 0 时从 trace[resume]
+        恢复,沿用 self._greedy_placements 中此前各学期的选课结果。
+        """
+        rank: Dict[str, int] = {c.id: i for i, c in enumerate(sorted_courses)}
+        if resume > 0:
+            state = trace[resume]
+            in_degree = dict(state.in_degree)
+            ready: Dict[str, List[Course]] = {
+                season: sorted((self.courses[course_id]
+                                for course_id in course_ids),
+                               key=lambda c: rank[c.id])
+                for season, course_ids in state.ready.items()
+            }
+            credit_accum = state.credit_accum
+            placements = self._greedy_placements[:state.placed]
+            del trace[resume:]
+        else:
+            # 每门课尚未修完的先修课数；不存在于课程表中的先修课永远不会修完
+            in_degree: Dict[str, int] = {
+                c.id: len(set(c.prerequisites)) for c in sorted_courses
+            }
+            ready = {"Autumn": [], "Spring": []}
+            for course in sorted_courses:
+                if in_degree[course.id] == 0 and course.semester in ready:
+                    ready[course.semester].append(course)
+            credit_accum = 0  # credit accummulation
+            placements: List[Tuple[Course, Offering, int]] = []
+            if trace is not None:
+                trace.clear()
+
+        semester_idx = resume  # 学期计数,从0开始,偶数秋季、奇数春季
+        sel_required = 0  # 已选必修课计数
 
         while (semester_idx < 8
                and (not enable_required or sel_required < self.all_required)):
+            if trace is not None:
+                trace.append(
+                    _SemesterState(in_degree=dict(in_degree),
+                                   ready={
+                                       season: [c.id for c in courses]
+                                       for season, courses in ready.items()
+                                   },
+                                   credit_accum=credit_accum,
+                                   placed=len(placements)))
             credit_this_sem = 0
             # 当前学期季节
             current_season = "Autumn" if semester_idx % 2 == 0 else "Spring"
-            taken_id_this_sem = []  # 本学期选中的课程的id
-            taken_this_sem = []  # 本学期选中的课程Offering
+            taken_this_sem: List[Course] = []  # 本学期选中的课程
+            # 本学期已占用的 周×天×节 位图,选课时并入
+            occupied: int = 0
 
-            # 遍历所有课程,选择满足条件的课程
-            for course in sorted_courses:
-                if ((len(taken_id_this_sem) > course_lower_limit
+            # 遍历本季节就绪的课程,选择满足条件的课程；未选中的留在队列中
+            candidates = ready[current_season]
+            waiting: List[Course] = []
+            for pos, course in enumerate(candidates):
+                if ((len(taken_this_sem) > course_lower_limit
                      and (credit_this_sem > min_credits // 6))):
+                    waiting.extend(candidates[pos:])
                     break
-                if course.id in completed:
-                    continue
-                if course.semester != current_season:
-                    continue  # 仅当课程在当前学期开设
-                # 检查前置课程是否都已完成
-                if any(prereq not in completed or prereq in taken_id_this_sem
-                       for prereq in course.prerequisites):
-                    continue
                 # 检查本学期是否存在学分剩余
                 if credit_this_sem + course.credit > credit_limit_per_sem:
+                    waiting.append(course)
                     continue
                 # 检查是否存在一个班级满足时间条件
                 chosen_offering = None
                 for off in course.offerings:
-                    if is_time_conflict(off.times, self.forbidden_times):
+                    if is_time_conflict(off.slot_mask, self.forbidden_mask):
                         continue  # 与禁排时间冲突
-                    if any(
-                            is_time_conflict(off.times, other.times)
-                            for other in taken_this_sem):
+                    if is_time_conflict(off.time_mask, occupied):
                         continue  # 与本学期已选课程冲突
                     chosen_offering = off
                     break
-                if chosen_offering:
-                    # 选入本学期
-                    taken_id_this_sem.append(course.id)
-                    taken_this_sem.append(chosen_offering)
-                    completed.add(course.id)
-                    credit_accum += course.credit
-                    credit_this_sem += course.credit
-                    # 记录排课结果：课程ID、所选班级ID、学期编号
-                    schedule.append({
-                        "class_id": chosen_offering.id,
-                        "course_id": course.id,
-                        "semester": semester_idx
-                    })
-                    if credit_accum >= min_credits:
-                        break
-            semester_idx += 1
-
-        # 对未被选中的课程,写入空选信息（semester=-1, class_id=""）
-        for course in sorted_courses:
-            if course.id not in completed:
-                schedule.append({
-                    "class_id": "",
-                    "course_id": course.id,
-                    "semester": -1
-                })
+                if chosen_offering is None:
+                    waiting.append(course)
+                    continue
+                # 选入本学期
+                taken_this_sem.append(course)
+                occupied |= chosen_offering.time_mask
+                credit_accum += course.credit
+                credit_this_sem += course.credit
+                placements.append((course, chosen_offering, semester_idx))
+                if credit_accum >= min_credits:
+                    waiting.extend(candidates[pos + 1:])
+                    break
+            ready[current_season] = waiting
 
-        # 输出到 schedule.json（格式参见要求:contentReference[oaicite:7]{index=7}）
-        with open(schedule_file, 'w', encoding='utf-8') as f:
-            json.dump(schedule, f, ensure_ascii=False, indent=2)
+            # 本学期选中的课程修完后,其后续课程的入度减一
+            for course in taken_this_sem:
+                for dependent_id in self.dependents.get(course.id, ()):
+                    in_degree[dependent_id] -= 1
+                    dependent = self.courses[dependent_id]
+                    if (in_degree[dependent_id] == 0
+                            and dependent.semester in ready):
+                        insort(ready[dependent.semester],
+                               dependent,
+                               key=lambda c: rank[c.id])
+            semester_idx += 1
+        return placements
 
     def set_priority(self, course_id: str, priority: int):
         """设置课程的优先级（缺省为9）。"""
         if self.courses.get(course_id, None) is not None:
-            primal: int = self.courses[course_id].priority
-            self.courses[course_id].priority = priority
-            self._check_course_priority(self.courses[course_id])
+            primal: int = self.priorities[course_id]
+            self.priorities[course_id] = priority
+            changed = self._raise_prereq_priority([self.courses[course_id]])
+            changed.add(course_id)
+            # 排序只在就绪队列内部起作用：从这些课程首次就绪的学期起重排
+            self._mark_dirty(
+                lambda candidates: not changed.isdisjoint(candidates))
             return primal
         return -1
 
@@ -154,17 +528,75 @@ class CourseScheduler:
         """设置每周7天的禁排时间段（位图）,默认全0表示不限排。"""
         if len(forbidden) == 7:
             self.forbidden_times = forbidden[:]
+            delta = self.forbidden_mask ^ pack_times(self.forbidden_times)
+            self.forbidden_mask ^= delta
+            if delta and self._greedy_trace:
+                # 从第一个有就绪课程的班级落在变动时段上的学期起重排
+                changed = self.courses_meeting(delta)
+                self._mark_dirty(
+                    lambda candidates: not changed.isdisjoint(candidates))
 
-    def _check_course_priority(self, course: Course):
-        """将先修课的优先级上调"""
-        prereqs: List[str] = course.prerequisites
-        priority: int = course.priority - 1 or 1
-        for prereq in prereqs:
-            if self.courses.get(prereq, None) is None:
-                continue
-            if (self.courses[prereq].priority > priority):
-                self.courses[prereq].priority = priority
-                self._check_course_priority(self.courses[prereq])
+    def _mark_dirty(self, affects):
+        """记录最早一个 affects(本学期就绪课程id) 为真的学期,下次贪心排课从此处重排"""
+        for semester_idx, state in enumerate(self._greedy_trace):
+            if (self._dirty_semester is not None
+                    and semester_idx >= self._dirty_semester):
+                return
+            season = "Autumn" if semester_idx % 2 == 0 else "Spring"
+            if affects(state.ready[season]):
+                self._dirty_semester = semester_idx
+                return
+
+    def _propagate_priorities(self):
+        """载入时一次拓扑遍历：后续课先于其先修课处理,将先修课的优先级上调
+
+        每条先修边只处理一次；先修关系成环的课程退回到 _raise_prereq_priority。
+        """
+        pending: Dict[str, int] = {course_id: 0 for course_id in self.courses}
+        for course in self.courses.values():
+            for prereq in course.prerequisites:
+                if prereq in pending:
+                    pending[prereq] += 1
+        queue = deque(self.courses[course_id]
+                      for course_id, count in pending.items() if count == 0)
+        priorities = self.priorities
+        while queue:
+            course = queue.popleft()
+            priority: int = priorities[course.id] - 1 or 1
+            for prereq in course.prerequisites:
+                if prereq not in pending:
+                    continue
+                prereq_course = self.courses[prereq]
+                if priorities[prereq] > priority:
+                    priorities[prereq] = priority
+                pending[prereq] -= 1
+                if pending[prereq] == 0:
+                    queue.append(prereq_course)
+        self._raise_prereq_priority(
+            [self.courses[course_id] for course_id, count in pending.items()
+             if count > 0])
+
+    def _raise_prereq_priority(self, courses: List[Course]) -> Set[str]:
+        """从 courses 出发沿先修关系上调优先级,只访问优先级被改动的祖先
+
+        Returns:
+            Set[str]: 优先级被改动的先修课id
+        """
+        changed: Set[str] = set()
+        priorities = self.priorities
+        stack: List[Course] = list(courses)
+        while stack:
+            course = stack.pop()
+            priority: int = priorities[course.id] - 1 or 1
+            for prereq in course.prerequisites:
+                prereq_course = self.courses.get(prereq, None)
+                if prereq_course is None:
+                    continue
+                if priorities[prereq] > priority:
+                    priorities[prereq] = priority
+                    changed.add(prereq)
+                    stack.append(prereq_course)
+        return changed
 
     # def add_course(self, course_data: dict):
     #     """新增课程,course_data 与 JSON 中课程结构一致。"""
@@ -203,12 +635,7 @@ class CourseScheduler:
     #     return self.courses.get(course_id)
 
 
-def is_time_conflict(times1: List[int], times2: List[int]) -> bool:
-    """判断两门课程每周7天上课时间是否有冲突。"""
-    return any((a & b) != 0 for a, b in zip(times1, times2))
-
-
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Schedule:
     id: str
     name: str
@@ -217,6 +644,22 @@ class Schedule:
     times: List[int]
     weeks: int
     required: str
+    slot_mask: int = field(init=False, repr=False, compare=False, default=0)
+
+    def __post_init__(self):
+        object.__setattr__(self, "slot_mask", pack_times(self.times))
+
+    @property
+    def time_mask(self) -> int:
+        return spread_mask(self.slot_mask, self.weeks)
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+def journal_path(schedule_file: str) -> str:
+    """schedule.json 对应的修改日志路径（同目录、扩展名 .journal）"""
+    return os.path.splitext(schedule_file)[0] + ".journal"
 
 
 class ScheduleVisualizer:
@@ -231,19 +674,57 @@ class ScheduleVisualizer:
         else:
             self.cs = cs
 
+        # 增删改课程时逐条追加到修改日志,而非重写整个 schedule.json；
+        # 仅当内存中的方案来自（或已写入）schedule_file 时才记日志
+        self.schedule_file: str = None
+        self.persist_worker: PersistWorker = PERSIST_WORKER
+        self.journal_entries = 0
         # 每一slot是一个semester的课程
         self.completed: Dict[str, int] = dict()
+        # 各学期的修改版本号,以及 (学期, 周) -> (生成时的版本号, 课程表)
+        self._versions: List[int] = [0] * 9
+        self._grids: Dict[Tuple[int, int], Tuple[int,
+                                                 List[List[Schedule]]]] = {}
+        # 各学期已选课程的 周×天×节 位图之并；None 表示需要重建
+        self._occupied: List[int] = [None] * 9
         self.schedules: List[Dict[str, Schedule]] = self.load_schedule(
             schedule_file=schedule_file)
 
+    def adopt_plan(self, plan: SchedulePlan):
+        """直接采用 schedule_courses 返回的方案（不经过文件）"""
+        schedules: List[Dict[str, Schedule]] = [dict() for _ in range(9)]
+        self.completed.clear()
+
+        for course, offering, semester in plan.placements:
+            self.completed[course.id] = semester
+            schedules[semester][course.id] = Schedule(
+                course.id, course.name, offering.id, offering.teacher,
+                offering.times, offering.weeks, course.required)
+        for course in plan.unscheduled:
+            schedules[-1][course.id] = Schedule(course.id, course.name, "",
+                                                None, None, 0,
+                                                course.required)
+        self.schedules = schedules[:]
+        self._touch_all()
+        self.schedule_file = None  # 尚未写入文件,修改只保存在内存中
+        return schedules
+
     def load_schedule(self, *, schedule_file: str = SCHEDULE_FILE):
-        """Load Schedule from File"""
+        """Load Schedule from File（并重放其修改日志）"""
+        self.flush()  # 先等待尚未写出的快照
         schedules: List[Dict[str, Schedule]] = [dict() for _ in range(9)]
         self.completed.clear()
 
-        with open(schedule_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        for entry in data:
+        # 同一课程以最后一条记录为准
+        entries: Dict[str, Dict[str, Any]] = {}
+        for entry in iter_json_array(schedule_file):
+            entries[entry["course_id"]] = entry
+        self.journal_entries = 0
+        for entry in self._read_journal(journal_path(schedule_file)):
+            entries[entry["course_id"]] = entry
+            self.journal_entries += 1
+
+        for entry in entries.values():
             course_id: str = entry["course_id"]
             class_id: str = entry["class_id"]
             semester: int = entry["semester"]
@@ -252,10 +733,10 @@ class ScheduleVisualizer:
                 offering_info: Offering = None
             else:
                 self.completed[course_id] = semester
-                offering_info: Offering = [
-                    offering for offering in course_info.offerings
-                    if offering.id == class_id
-                ][0]
+                offering_info = self.cs.get_offering(course_id, class_id)
+                if offering_info is None:
+                    raise ValueError(f"Unknown class {class_id!r} "
+                                     f"of course {course_id!r}")
             if offering_info is None:
                 schedules[semester][course_id] = Schedule(
                     course_id, course_info.name, class_id, None, None, 0,
@@ -265,10 +746,12 @@ class ScheduleVisualizer:
                 course_id, course_info.name, class_id, offering_info.teacher,
                 offering_info.times, offering_info.weeks, course_info.required)
         self.schedules = schedules[:]
+        self._touch_all()
+        self.schedule_file = schedule_file
         return schedules
 
     def dump_schedule(self, *, schedule_file: str = SCHEDULE_FILE):
-        """Dump cached schedule to schedule.json"""
+        """Dump cached schedule to schedule.json（合并并清空修改日志）"""
         schedules: List[Dict[str, Any]] = list()
         for semester_idx, this_semester in enumerate(self.schedules):
             for course in this_semester.values():
@@ -282,61 +765,117 @@ class ScheduleVisualizer:
                     "semester": real_idx
                 })
         # 输出到 schedule.json（格式参见要求:contentReference[oaicite:7]{index=7}）
-        with open(schedule_file, 'w', encoding='utf-8') as f:
-            json.dump(schedules, f, ensure_ascii=False, indent=2)
+        # 由后台线程编码并原子地写出；写出后截去此前的修改日志。
+        # 日志中的每条记录都是课程的完整状态,替换后即使未能截去日志,重放结果也不变
+        self.persist_worker.submit(schedule_file, schedules,
+                                   journal_path(schedule_file))
+        self.schedule_file = schedule_file
+        self.journal_entries = 0
+
+    def compact_journal(self):
+        """若有未合并的修改日志,将其合并进 schedule.json"""
+        if self.schedule_file is not None and self.journal_entries > 0:
+            self.dump_schedule(schedule_file=self.schedule_file)
+
+    def flush(self, timeout: float = None) -> bool:
+        """等待 dump_schedule 登记的快照写出到磁盘（超时返回 False）"""
+        return self.persist_worker.flush(timeout)
+
+    def _journal(self, course_id: str, class_id: str, semester: int):
+        """追加一条 schedule.json 格式的记录到修改日志"""
+        if self.schedule_file is None:
+            return
+        entry = {"class_id": class_id, "course_id": course_id,
+                 "semester": semester}
+        self.persist_worker.append(journal_path(self.schedule_file),
+                                   json.dumps(entry, ensure_ascii=False) +
+                                   "\n")
+        self.journal_entries += 1
+
+    def _maybe_compact(self):
+        """日志累积到 JOURNAL_LIMIT 条时合并进 schedule.json
+
+        只在一次增删改整体完成后调用,快照中不会出现做了一半的修改。
+        """
+        if self.journal_entries >= JOURNAL_LIMIT:
+            self.compact_journal()
+
+    @staticmethod
+    def _read_journal(journal_file: str):
+        """逐条读取修改日志；末尾写了一半的记录（崩溃所致）被截去"""
+        if not os.path.exists(journal_file):
+            return
+        with open(journal_file, 'rb+') as f:
+            good = 0
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError(line)
+                    entry = json.loads(line)
+                except ValueError:
+                    f.truncate(good)  # 之后追加的记录不会接在残缺的行上
+                    return
+                good += len(line)
+                yield entry
 
     def get_course_info(self,
                         *,
-                        course_keyword: str = "") -> Dict[Course, Any]:
-        """按照id或课程名称或教师名称查课"""
+                        course_keyword: str = "",
+                        offset: int = 0,
+                        limit: int = None) -> Dict[Course, Any]:
+        """按照id或课程名称或教师名称查课
+
+        结果按匹配程度排序（见 SearchIndex）,取其中第 offset 条起的 limit 条
+        （limit 为 None 时取到末尾）；值为该课程是否已选。
+        """
         if len(course_keyword.strip()) == 0:
             return {}
 
+        index = self.cs.search_index()
+        hits = index.search(course_keyword)
+        stop = None if limit is None else offset + limit
         result: Dict[Course, bool] = {}
-        for course in self.cs.courses.values():
-            if course_keyword in course.id:
-                result[course] = (course in self.completed)
-            elif course_keyword in course.name:
-                result[course] = (course in self.completed)
-            elif any(course_keyword in offer.teacher
-                     for offer in course.offerings):
-                result[course] = (course in self.completed)
+        for i in hits[offset:stop]:
+            course = self.cs.courses[index.ids[i]]
+            result[course] = (course.id in self.completed)
         return result
 
     def add_course(self, *, course_id: str = "", offer_id: str = "") -> int:
-        """尝试按照课程id(和教学班id)参与课程"""
+        """尝试按照课程id(和教学班id)参与课程
+
+        课程已选时改为更换其教学班（同 update_course）,不会重复选课。
+        """
         if len(course_id) == 0 or len(offer_id) == 0:
             return 1
         course = self.cs.courses.get(course_id, None)
         if course is None:
             return 1
-        for offer in course.offerings:
-            if offer_id == offer.id:
-                break
-        else:
+        offer = self.cs.get_offering(course_id, offer_id)
+        if offer is None:
             return 1
+        if course_id in self.completed:
+            return self.update_course(course_id=course_id, offer_id=offer_id)
 
+        if course.semester not in SEASONS:
+            return 2
         if course.prerequisites:
-            semester_idx: int = max(
+            start: int = max(
                 self.completed.get(prereq, 8)
-                for prereq in course.prerequisites)
+                for prereq in course.prerequisites) + 1
         else:
-            semester_idx = -1
-        while semester_idx < 7:
-            semester_idx += 1
-            season = "Autumn" if semester_idx % 2 == 0 else "Spring"
-            if course.semester != season:
-                continue
-            if any(
-                    is_time_conflict(offer.times, primcourse.times)
-                    for primcourse in self.schedules[semester_idx].values()):
+            start = 0
+        start += (SEASONS.index(course.semester) - start) % 2  # 对齐到本课的季节
+        for semester_idx in range(start, 8, 2):
+            if is_time_conflict(offer.time_mask,
+                                self._occupancy(semester_idx)):
                 continue
 
+            self._del_schedule(course_id=course.id, semester=-1)
             self._add_schedule(course=course,
                                offer=offer,
                                semester=semester_idx)
-            self._del_schedule(course_id=course.id, semester=-1)
             self.completed[course_id] = semester_idx
+            self._maybe_compact()
             return 0
         return 2
 
@@ -353,14 +892,15 @@ class ScheduleVisualizer:
         if semester_idx == -1:
             return 0
 
+        self._del_schedule(course_id=course.id, semester=semester_idx)
         self._add_schedule(course=course,
                            offer=Offering(id="",
                                           teacher="",
                                           times=[0 for _ in range(7)],
                                           weeks=0),
                            semester=-1)
-        self._del_schedule(course_id=course.id, semester=semester_idx)
         del self.completed[course_id]
+        self._maybe_compact()
         return 0
 
     def update_course(self, *, course_id: str = "", offer_id: str = "") -> int:
@@ -373,6 +913,8 @@ class ScheduleVisualizer:
         semester_cache: int = self.completed.get(course.id, -1)
         if semester_cache == -1:
             return 1
+        if self.cs.get_offering(course_id, offer_id) is None:
+            return 1
         course_cache: Schedule = self.schedules[semester_cache][course.id]
         if course_cache.class_id == offer_id:
             return 0
@@ -382,8 +924,9 @@ class ScheduleVisualizer:
         if status != 0:
             self.add_course(course_id=course.id,
                             offer_id=course_cache.class_id)
-            return 2
-        return 0
+            status = 2
+        self._maybe_compact()
+        return status
 
     def set_priority(self, priority: int = 9, *, course_id: str = "") -> int:
         """设置/查询优先级
@@ -402,14 +945,29 @@ class ScheduleVisualizer:
         if course is None:
             return -1
         if priority == 0:
-            return self.cs.courses[course_id].priority
+            return self.cs.priorities[course_id]
         elif priority < 0:
             priority = 1
         primal: int = self.cs.set_priority(course_id=course_id,
                                            priority=priority)
         return primal
 
+    def _occupancy(self, semester: int) -> int:
+        """该学期已选课程的 周×天×节 位图之并（删除课程后按需重建）"""
+        occupied = self._occupied[semester]
+        if occupied is None:
+            occupied = 0
+            for schedule in self.schedules[semester].values():
+                occupied |= schedule.time_mask
+            self._occupied[semester] = occupied
+        return occupied
+
     def _add_schedule(self, course: Course, offer: Offering, semester: int):
+        if (course.id in self.schedules[semester]
+                or self._occupied[semester] is None):
+            self._occupied[semester] = None  # 替换了原有记录,需重建
+        else:
+            self._occupied[semester] |= offer.time_mask
         self.schedules[semester][course.id] = Schedule(
             id=course.id,
             name=course.name,
@@ -418,26 +976,46 @@ class ScheduleVisualizer:
             times=offer.times[:],
             weeks=offer.weeks,
             required=course.required)
+        self._versions[semester] += 1
+        self._journal(course.id, offer.id, semester)
 
     def _del_schedule(self, course_id: str, semester: int):
         if course_id in self.schedules[semester]:
             del self.schedules[semester][course_id]
+            self._versions[semester] += 1
+            self._occupied[semester] = None
+
+    def _touch_all(self):
+        """整体替换方案后,令所有学期已生成的课程表失效"""
+        for semester in range(len(self._versions)):
+            self._versions[semester] += 1
+            self._occupied[semester] = None
+
+    def get_schedule_table(self,
+                           *,
+                           semester: int,
+                           week: int = None) -> List[List[Schedule]]:
+        """获取某一学期的课程表（7天×13节）
+
+        给出 week 时只含第 week 周（weeks 的第 week 位）有课的课程。
+        生成的课程表按 (学期, 周) 缓存,直到该学期被修改；调用者不应修改它。
+        """
+        version = self._versions[semester]
+        cached = self._grids.get((semester, week))
+        if cached is not None and cached[0] == version:
+            return cached[1]
 
-    def get_schedule_table(self, *, semester: int) -> List[List[Schedule]]:
-        """获取某一学期的课程表"""
         schedules_this_sem: Dict[Schedule] = self.schedules[semester]
         schedule_table: List[List[Schedule]] = [[None for _ in range(13)]
                                                 for _i in range(7)]
 
         for schedule in schedules_this_sem.values():
-            for day in range(7):
-                time_day = schedule.times[day]
-                time_specifier = 0
-                while time_specifier < 14:
-                    if time_day & (2**time_specifier):
-                        schedule_table[day][time_specifier] = schedule
-                    time_specifier += 1
+            if week is not None and not schedule.weeks >> week & 1:
+                continue
+            for day, slot in iter_slots(schedule.slot_mask):
+                schedule_table[day][slot] = schedule
 
+        self._grids[(semester, week)] = (version, schedule_table)
         return schedule_table
 
 
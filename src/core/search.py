@@ -0,0 +1,158 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Sequence, Set, Tuple
+
+_RESULT_CACHE = 16  # 缓存最近几次查询的完整结果,翻页时不必重新检索
+_SMALL = 32  # 候选数不多于此时不再与其余倒排表求交,直接逐个核对
+
+
+def _grams(text: str) -> Iterator[str]:
+    """text 中的各个单字与相邻二字组"""
+    for k in range(len(text)):
+        yield text[k]
+        if k + 1 < len(text):
+            yield text[k:k + 2]
+
+
+class Postings(Mapping):
+    """单字/二字组 -> 升序课程下标 的倒排表,以 CSR 形式存放,可直接存入编译文件
+
+    grams 按字典序排列,第k个字组的倒排表为 idx[ptr[k]:ptr[k+1]]。
+    """
+
+    def __init__(self, grams: Sequence[str], ptr, idx):
+        self.grams = grams
+        self.ptr = ptr
+        self.idx = idx
+
+    @classmethod
+    def from_dict(cls, postings: Dict[str, List[int]]) -> "Postings":
+        grams = sorted(postings)
+        ptr = array('I', [0])
+        idx = array('I')
+        for gram in grams:
+            idx.extend(postings[gram])
+            ptr.append(len(idx))
+        return cls(grams, ptr, idx)
+
+    def __getitem__(self, gram: str) -> Sequence[int]:
+        k = bisect_left(range(len(self.grams)), gram,
+                        key=self.grams.__getitem__)
+        if k == len(self.grams) or self.grams[k] != gram:
+            raise KeyError(gram)
+        return self.idx[self.ptr[k]:self.ptr[k + 1]]
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.grams[k] for k in range(len(self.grams)))
+
+    def __len__(self) -> int:
+        return len(self.grams)
+
+
+class SearchIndex:
+    """课程检索索引：课程id的有序后缀索引,以及名称、教师的单字/二字组倒排表
+
+    id 的全部后缀按字典序排列,以关键字为前缀的一段即 id 中含有关键字的课程,
+    其中后缀起点为0的是 id 前缀匹配。名称与教师由短到长求关键字各二字组
+    （关键字只有一个字时为该字）倒排表的交集作为候选,再逐个核对。
+    结果依次按 id相同、id前缀、名称前缀、名称包含、id包含、教师包含 排序,
+    同一档内保持课程表中的顺序。
+    各部分均为类型化数组,可存入编译后的课程表文件,载入时无需重建（见 catalog.py）。
+    """
+
+    def __init__(self, ids: Sequence[str], names: Sequence[str],
+                 teachers: Sequence[Tuple[str, ...]], suffix_course,
+                 suffix_start, postings: Postings):
+        self.ids = ids
+        self.names = names
+        self.teachers = teachers  # 各课程去重后的教师
+        # 第 k 个后缀为 ids[_suffix_course[k]][_suffix_start[k]:]
+        self._suffix_course = suffix_course
+        self._suffix_start = suffix_start
+        self._postings = postings
+        self._results: Dict[str, List[int]] = {}  # 关键字 -> 排好序的结果
+
+    @classmethod
+    def build(cls, ids: Sequence[str], names: Sequence[str],
+              teachers: Iterable[Iterable[str]]) -> "SearchIndex":
+        ids = list(ids)  # 检索时逐个访问,先解码成列表
+        names = list(names)
+        suffixes = sorted(((course_id[start:], i, start)
+                           for i, course_id in enumerate(ids)
+                           for start in range(len(course_id))))
+        suffix_course = array('I', (i for _, i, _ in suffixes))
+        suffix_start = array('I', (start for _, _, start in suffixes))
+        del suffixes
+        course_teachers: List[Tuple[str, ...]] = []
+        postings: Dict[str, List[int]] = {}
+        for i, texts in enumerate(teachers):
+            texts = tuple(dict.fromkeys(texts))
+            course_teachers.append(texts)
+            for text in (names[i], *texts):
+                for gram in _grams(text):
+                    posting = postings.setdefault(gram, [])
+                    if not posting or posting[-1] != i:
+                        posting.append(i)
+        return cls(ids, names, course_teachers, suffix_course, suffix_start,
+                   Postings.from_dict(postings))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _suffix(self, k: int) -> str:
+        return self.ids[self._suffix_course[k]][self._suffix_start[k]:]
+
+    def search(self, keyword: str) -> List[int]:
+        """包含 keyword 的课程下标,按匹配程度排序（调用者不得修改返回的列表）"""
+        if not keyword:
+            return []
+        hits = self._results.get(keyword)
+        if hits is None:
+            hits = self._search(keyword)
+            if len(self._results) >= _RESULT_CACHE:
+                del self._results[next(iter(self._results))]
+            self._results[keyword] = hits
+        return hits
+
+    def _candidates(self, keyword: str) -> Set[int]:
+        """名称或教师可能包含 keyword 的课程下标（各二字组倒排表之交）"""
+        grams = {keyword} if len(keyword) == 1 else {
+            keyword[k:k + 2] for k in range(len(keyword) - 1)
+        }
+        postings = sorted((self._postings.get(gram, ()) for gram in grams),
+                          key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if len(candidates) <= _SMALL:
+                break
+            candidates.intersection_update(posting)
+        return candidates
+
+    def _search(self, keyword: str) -> List[int]:
+        ranks: Dict[int, int] = {}
+        k = bisect_left(range(len(self._suffix_course)), keyword,
+                        key=self._suffix)
+        while (k < len(self._suffix_course)
+               and self._suffix(k).startswith(keyword)):
+            i = self._suffix_course[k]
+            if self._suffix_start[k] > 0:
+                ranks.setdefault(i, 4)
+            else:
+                ranks[i] = 0 if self.ids[i] == keyword else 1
+            k += 1
+        for i in self._candidates(keyword):
+            if ranks.get(i, 4) < 4:
+                continue
+            name = self.names[i]
+            if name.startswith(keyword):
+                ranks[i] = 2
+            elif keyword in name:
+                ranks[i] = 3
+            elif i not in ranks and any(keyword in teacher
+                                        for teacher in self.teachers[i]):
+                ranks[i] = 5
+        tiers: List[List[int]] = [[] for _ in range(6)]
+        for i, rank in ranks.items():
+            tiers[rank].append(i)
+        return [i for tier in tiers for i in sorted(tier)]
@@ -0,0 +1,692 @@
+from typing import (TYPE_CHECKING, Dict, List, Optional, Sequence, Set,
+                    Tuple)
+import time
+
+from .conflict import ConflictGraph, bitset, iter_bits
+from .timemask import is_time_conflict
+
+if TYPE_CHECKING:
+    from .schedule_util import Course, Offering
+
+SEMESTERS = 8  # 共8个学期,偶数秋季、奇数春季
+
+
+def course_weights(courses: List["Course"],
+                   enable_required: bool) -> List[int]:
+    """把 (必修课数, 学分) 的字典序目标折算为每门课的整数权重。
+
+    enable_required 时必修课数优先,否则学分优先。
+    """
+    total_credit = sum(c.credit for c in courses)
+    total_required = sum(c.required == "Compulsory" for c in courses)
+    weights = []
+    for course in courses:
+        required = 1 if course.required == "Compulsory" else 0
+        if enable_required:
+            weights.append(required * (total_credit + 1) + course.credit)
+        else:
+            weights.append(course.credit * (total_required + 1) + required)
+    return weights
+
+
+def _unwind(path) -> List[Tuple["Course", "Offering", int]]:
+    """把 (前驱, 选课) 链表形式的搜索路径还原为按学期排序的选课列表"""
+    placements = []
+    while path is not None:
+        path, placement = path
+        placements.append(placement)
+    placements.reverse()
+    placements.sort(key=lambda p: p[2])
+    return placements
+
+
+class _SolverBase:
+    """精确求解器的公共预处理：课程下标、先修位集、未被禁排的班级与权重"""
+
+    def __init__(self,
+                 sorted_courses: List["Course"],
+                 forbidden_mask: int = 0,
+                 *,
+                 enable_required: bool = False,
+                 credit_limit_per_sem: int = 5000,
+                 node_limit: int = 200000,
+                 time_limit: float = 5.0):
+        # 时限从构造时起算,预处理也计入
+        self.deadline = time.perf_counter() + time_limit
+        self.courses = sorted_courses
+        self.credit_limit = credit_limit_per_sem
+        self.node_limit = node_limit
+        self.time_limit = time_limit
+        self.weights = course_weights(sorted_courses, enable_required)
+        self.nodes = 0  # 已展开的结点数
+        self.optimal = False  # 搜索是否在预算内完成（结果可证明最优）
+
+        self.index: Dict[str, int] = {
+            c.id: i for i, c in enumerate(sorted_courses)
+        }
+        # 每门课的先修位集与未被禁排的班级（及其在 course.offerings 中的下标）；
+        # 先修课不存在或无可用班级的课程不参与搜索
+        self.prereq_bits: List[int] = []
+        self.offerings: List[List["Offering"]] = []
+        self.positions: List[List[int]] = []
+        self.feasible: List[bool] = []
+        for course in sorted_courses:
+            bits = 0
+            feasible = True
+            for prereq in course.prerequisites:
+                if prereq not in self.index:
+                    feasible = False
+                    continue
+                bits |= 1 << self.index[prereq]
+            positions = [
+                t for t, off in enumerate(course.offerings)
+                if not is_time_conflict(off.slot_mask, forbidden_mask)
+            ]
+            offerings = [course.offerings[t] for t in positions]
+            self.prereq_bits.append(bits)
+            self.offerings.append(offerings)
+            self.positions.append(positions)
+            self.feasible.append(feasible and bool(offerings))
+
+        # 开设季节（0 秋、1 春）、先修课在前的课程次序,
+        # 以及由先修链推出的最早可修学期（不可修时为 SEMESTERS）
+        self.parity = [0 if c.semester == "Autumn" else 1
+                       for c in sorted_courses]
+        self.order = self._topological_order()
+        self.earliest = [SEMESTERS] * len(sorted_courses)
+        for i in self.order:
+            if not self.feasible[i]:
+                continue
+            start = max((self.earliest[p] + 1
+                         for p in iter_bits(self.prereq_bits[i])), default=0)
+            start += (self.parity[i] - start) % 2  # 对齐到本课开设的季节
+            self.earliest[i] = min(start, SEMESTERS)
+
+    def _topological_order(self) -> List[int]:
+        """先修课在前、其余按 sorted_courses 顺序的变量次序"""
+        order: List[int] = []
+        placed = 0
+        pending = list(range(len(self.courses)))
+        while pending:
+            rest = []
+            for i in pending:
+                if self.prereq_bits[i] & ~placed == 0:
+                    order.append(i)
+                    placed |= 1 << i
+                else:
+                    rest.append(i)
+            if len(rest) == len(pending):
+                order.extend(rest)  # 先修关系成环,余下课程按原顺序
+                break
+            pending = rest
+        return order
+
+    def _score(self, placements: List[Tuple["Course", "Offering", int]]):
+        return sum(self.weights[self.index[c.id]] for c, _o, _s in placements)
+
+
+class BranchAndBound(_SolverBase):
+    """精确排课：逐学期、逐课程地分支（选某个班级 / 本学期不选）,
+
+    以"已得分 + 仍可能修读课程的权重和"与拉格朗日松弛界（见 _relax）中
+    较小者为上界剪枝,并按 (学期, 位置, 已修位集, 本学期已选位集, 占用位图)
+    记忆已搜索状态。先只找接近上界的方案,找不到再逐步放宽,以便尽早证明最优；
+    超出 node_limit 或 time_limit 时返回目前最优解。
+    """
+
+    def __init__(self, sorted_courses: List["Course"], *args, **kwargs):
+        super().__init__(sorted_courses, *args, **kwargs)
+        # 按季节分组的候选课程（保持 sorted_courses 的顺序）
+        self.season_courses: List[List[int]] = [[], []]
+        for i, course in enumerate(sorted_courses):
+            if self.feasible[i]:
+                parity = 0 if course.semester == "Autumn" else 1
+                self.season_courses[parity].append(i)
+        # 第 s 学期结束后不再开设的课程（该季节的最后一个学期）
+        self.expiring: List[List[int]] = [[] for _ in range(SEMESTERS)]
+        for parity, lst in enumerate(self.season_courses):
+            last = SEMESTERS - 1 if (SEMESTERS - 1) % 2 == parity \
+                else SEMESTERS - 2
+            self.expiring[last].extend(lst)
+
+        # 松弛所用结构：能在 8 个学期内修读的课程与先修弧 (课程, 先修课)；
+        # 时间格类在 _relax 中建立
+        n = len(sorted_courses)
+        self.relaxed = [i for i in range(n) if self.earliest[i] < SEMESTERS]
+        self.links: List[Tuple[int, int]] = []
+        self.pre_links: List[List[int]] = [[] for _ in range(n)]
+        self.dep_links: List[List[int]] = [[] for _ in range(n)]
+        for i in self.relaxed:
+            for j in iter_bits(self.prereq_bits[i]):
+                self.pre_links[i].append(len(self.links))
+                self.dep_links[j].append(len(self.links))
+                self.links.append((i, j))
+        self.cell_masks: List[int] = []
+        self.offering_cells: List[List[List[int]]] = [
+            [[] for _ in offs] for offs in self.offerings
+        ]
+
+    def _build_cells(self, deadline: float) -> None:
+        """时间格类：同季节中被同一组 (课程, 班级) 覆盖的 (周, 天, 节) 归为一类,
+
+        每学期每类至多被一门课占用。超时则不建立（松弛中不含时间冲突约束）。
+        """
+        cover: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+        for i in self.relaxed:
+            if time.perf_counter() > deadline:
+                return
+            for o, off in enumerate(self.offerings[i]):
+                for bit in iter_bits(off.time_mask):
+                    cover.setdefault((self.parity[i], bit), []).append((i, o))
+        classes: Dict[Tuple[int, Tuple[Tuple[int, int], ...]], int] = {}
+        for (parity, bit), members in cover.items():
+            if len({i for i, _o in members}) < 2:
+                continue
+            key = (parity, tuple(members))
+            if key not in classes:
+                classes[key] = len(self.cell_masks)
+                self.cell_masks.append(0)
+                for i, o in members:
+                    self.offering_cells[i][o].append(classes[key])
+            self.cell_masks[classes[key]] |= 1 << bit
+
+    def _reduced(self, lam: List[float], mu: List[float],
+                 nu: List[float]) -> List[List[Optional[List[float]]]]:
+        """各 (课程, 学期, 班级) 在给定乘子下的约化权重,不可选处为 None"""
+        rc: List[List[Optional[List[float]]]] = [
+            [None] * SEMESTERS for _ in self.courses
+        ]
+        # 各课程每学期作为后续课程 / 先修课程所在先修弧的乘子和
+        as_dependent = [[0.0] * SEMESTERS for _ in self.courses]
+        as_prereq = [[0.0] * (SEMESTERS + 1) for _ in self.courses]
+        for link, (i, j) in enumerate(self.links):
+            row = mu[link * SEMESTERS:(link + 1) * SEMESTERS]
+            mine, theirs = as_dependent[i], as_prereq[j]
+            for s in range(SEMESTERS):
+                mine[s] += row[s]
+                theirs[s] += row[s]
+        for i in self.relaxed:
+            credit = self.courses[i].credit
+            # freed[s]: 本课在 s 学期之前修完时,各后续课程先修弧上可得的乘子
+            freed = as_prereq[i]
+            for s in range(SEMESTERS - 1, -1, -1):
+                freed[s] += freed[s + 1]
+            for s in range(self.earliest[i], SEMESTERS, 2):
+                value = (self.weights[i] - nu[s] * credit + freed[s + 1] -
+                         as_dependent[i][s])
+                rc[i][s] = [
+                    value - sum(lam[k * SEMESTERS + s] for k in cells)
+                    for cells in self.offering_cells[i]
+                ]
+        return rc
+
+    def _relax(self, best_score: int, deadline: float
+               ) -> Optional[List[Tuple["Course", "Offering", int]]]:
+        """拉格朗日松弛：对偶化时间格、先修次序与学期学分上限三类约束,
+
+        松弛后每门课独立地取约化权重最大的 (学期, 班级) 或不选,
+        以次梯度法（Polyak 步长）压低其上界 self.bound。每轮把松弛解
+        修复为可行方案,得分超过 best_score 时返回其中最好者,否则返回 None。
+        """
+        self._build_cells(deadline)
+        lam = [0.0] * (len(self.cell_masks) * SEMESTERS)
+        mu = [0.0] * (len(self.links) * SEMESTERS)
+        nu = [0.0] * SEMESTERS
+        limit = self.credit_limit
+        self.bound = float("inf")
+        best_plan = None
+        step, stall = 2.0, 0
+        while True:
+            rc = self._reduced(lam, mu, nu)
+            bound = sum(lam) + sum(nu) * limit
+            chosen: Dict[int, Tuple[int, int]] = {}  # 课程 -> (学期, 班级)
+            for i in self.relaxed:
+                best = 0.0
+                for s in range(self.earliest[i], SEMESTERS, 2):
+                    for o, value in enumerate(rc[i][s]):
+                        if value > best:
+                            best = value
+                            chosen[i] = (s, o)
+                bound += best
+            if bound < self.bound:
+                self.bound, self.rc, stall = bound, rc, 0
+                multipliers = (lam[:], mu[:], nu[:])
+            else:
+                stall += 1
+                if stall >= 20:
+                    step, stall = step / 2, 0
+
+            # 修复：按学期、权重依次接受不与已接受者冲突的选择
+            placed: Dict[int, int] = {}
+            occupied = [0] * SEMESTERS
+            credits = [0] * SEMESTERS
+            plan = []
+            for i in sorted(chosen,
+                            key=lambda i: (chosen[i][0], -self.weights[i])):
+                s, o = chosen[i]
+                off = self.offerings[i][o]
+                if (all(placed.get(j, SEMESTERS) < s
+                        for j in iter_bits(self.prereq_bits[i]))
+                        and not is_time_conflict(off.time_mask, occupied[s])
+                        and credits[s] + self.courses[i].credit <= limit):
+                    placed[i] = s
+                    occupied[s] |= off.time_mask
+                    credits[s] += self.courses[i].credit
+                    plan.append((self.courses[i], off, s))
+            if self._score(plan) > best_score:
+                best_score, best_plan = self._score(plan), plan
+            if (self.bound - best_score < 1 or step < 1e-4
+                    or time.perf_counter() > deadline):
+                break
+
+            # 次梯度：各约束的松弛量；乘子为 0 且约束未被违反的分量不参与
+            use = [0] * len(lam)
+            load = [0] * SEMESTERS
+            for i, (s, o) in chosen.items():
+                for k in self.offering_cells[i][o]:
+                    use[k * SEMESTERS + s] += 1
+                load[s] += self.courses[i].credit
+            grads = []
+            for idx, value in enumerate(lam):
+                g = 1 - use[idx]
+                if g < 0 or value > 0:
+                    grads.append((lam, idx, g))
+            for link, (i, j) in enumerate(self.links):
+                before = chosen[j][0] if j in chosen else SEMESTERS
+                at = chosen[i][0] if i in chosen else -1
+                for s in range(self.earliest[i], SEMESTERS, 2):
+                    g = (before < s) - (at == s)
+                    if g < 0 or mu[link * SEMESTERS + s] > 0:
+                        grads.append((mu, link * SEMESTERS + s, g))
+            for s in range(SEMESTERS):
+                g = limit - load[s]
+                if g < 0 or nu[s] > 0:
+                    grads.append((nu, s, g))
+            norm = sum(g * g for _v, _idx, g in grads)
+            if norm == 0:
+                break
+            t = step * (bound - best_score) / norm
+            for values, idx, g in grads:
+                values[idx] = max(0.0, values[idx] - t * g)
+
+        # later[i][s]: 第 i 门课推迟到 s 学期之后修读时可得的最大约化权重（不低于 0）
+        self.later: List[List[float]] = [[0.0] * SEMESTERS
+                                         for _ in self.courses]
+        for i in self.relaxed:
+            for s in range(SEMESTERS - 2, -1, -1):
+                here = self.rc[i][s + 1]
+                self.later[i][s] = max(self.later[i][s + 1],
+                                       max(here) if here else 0.0)
+        # 学期结束时确定的松弛量：未被占用的时间格类、先修课已修而本课未选的
+        # 先修弧,以及剩余学分,各乘以其乘子,从上界中扣除
+        lam, mu, nu = multipliers
+        self.idle_cells: List[List[Tuple[int, float]]] = [
+            [] for _ in range(SEMESTERS)
+        ]
+        for idx, value in enumerate(lam):
+            if value > 0:
+                k, s = divmod(idx, SEMESTERS)
+                self.idle_cells[s].append((self.cell_masks[k], value))
+        self.idle_links: List[List[Tuple[int, int, float]]] = [
+            [] for _ in range(SEMESTERS)
+        ]
+        for idx, value in enumerate(mu):
+            if value > 0:
+                link, s = divmod(idx, SEMESTERS)
+                i, j = self.links[link]
+                self.idle_links[s].append((i, 1 << j, value))
+        self.credit_price = nu
+        self.base = sum(lam) + sum(nu) * limit
+        return best_plan
+
+    def _semester_bound(self, sem: int, done: int,
+                        reduced: float) -> Tuple[float, List[float]]:
+        """sem 学期开始时的松弛上界,及各课程从本学期起的最大约化权重"""
+        best = [0.0] * len(self.courses)
+        for i in self.relaxed:
+            if done >> i & 1:
+                continue
+            value = self.later[i][sem]
+            here = self.rc[i][sem]
+            if (here and self.prereq_bits[i] & ~done == 0
+                    and self.courses[i].credit <= self.credit_limit):
+                value = max(value, max(here))
+            best[i] = value
+        return self.base + reduced + sum(best), best
+
+    def _idle(self, sem: int, done: int, taken: int, occupied: int,
+              sem_credit: int) -> float:
+        """sem 学期结束时确定的松弛量（见 _relax）"""
+        idle = self.credit_price[sem] * (self.credit_limit - sem_credit)
+        for cells, value in self.idle_cells[sem]:
+            if not cells & occupied:
+                idle += value
+        for i, prereq, value in self.idle_links[sem]:
+            if done & prereq and not taken >> i & 1:
+                idle += value
+        return idle
+
+    def _search(self, floor: int, node_limit: int, deadline: float):
+        """寻找得分高于 floor 的最优方案,返回 (得分, 路径, 是否搜索完毕)"""
+        best_score, best_path = floor, None
+        seen: Set[Tuple[int, int, int, int, int]] = set()
+        weights = self.weights
+        potential = sum(w for w, ok in zip(weights, self.feasible) if ok)
+        bound, best = self._semester_bound(0, 0, 0.0)
+        # 结点: (学期, 位置, 已修位集, 本学期已选位集, 占用位图, 本学期学分,
+        #        得分, 得分上界, 已选约化权重和, 松弛上界, 各课最大约化权重, 路径)
+        stack = [(0, 0, 0, 0, 0, 0, 0, potential, 0.0, bound, best, None)]
+
+        while stack:
+            self.nodes += 1
+            if self.nodes > node_limit or (
+                    self.nodes & 1023 == 1
+                    and time.perf_counter() > deadline):
+                return best_score, best_path, False
+            (sem, pos, done, taken, occupied, sem_credit, score, potential,
+             reduced, bound, best, path) = stack.pop()
+            if score > best_score:
+                best_score, best_path = score, path
+            # 得分均为整数,松弛上界不足 best_score+1 即可剪枝（留出浮点误差）
+            if (sem >= SEMESTERS or potential <= best_score
+                    or bound < best_score + 1 - 1e-6):
+                continue
+            key = (sem, pos, done, taken, occupied)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            candidates = self.season_courses[sem % 2]
+            finished = done | taken
+            fits: List[Tuple[int, "Offering"]] = []
+            while pos < len(candidates):
+                i = candidates[pos]
+                if (not finished >> i & 1
+                        and self.prereq_bits[i] & ~done == 0
+                        and sem_credit + self.courses[i].credit
+                        <= self.credit_limit):
+                    fits = [
+                        (o, off) for o, off in enumerate(self.offerings[i])
+                        if not is_time_conflict(off.time_mask, occupied)
+                    ]
+                    if fits:
+                        break
+                pos += 1
+                # 候选课程很多时,一个结点内的扫描也可能超时
+                if pos & 1023 == 0 and time.perf_counter() > deadline:
+                    return best_score, best_path, False
+
+            if pos == len(candidates):
+                if sem + 1 >= SEMESTERS:
+                    continue
+                # 本学期结束：扣除此后不再开设且未修的课程,并重算松弛上界
+                lost = sum(weights[i] for i in self.expiring[sem]
+                           if not finished >> i & 1)
+                reduced -= self._idle(sem, done, taken, occupied, sem_credit)
+                bound, best = self._semester_bound(sem + 1, finished, reduced)
+                stack.append((sem + 1, 0, finished, 0, 0, 0, score,
+                              potential - lost, reduced, bound, best, path))
+                continue
+
+            i = candidates[pos]
+            course = self.courses[i]
+            rest = bound - best[i]
+            # 先压入"不选",再逆序压入各班级,使第一个可用班级最先展开
+            stack.append((sem, pos + 1, done, taken, occupied, sem_credit,
+                          score, potential, reduced,
+                          rest + self.later[i][sem], best, path))
+            for o, off in reversed(fits):
+                value = self.rc[i][sem][o]
+                stack.append((sem, pos + 1, done, taken | 1 << i,
+                              occupied | off.time_mask,
+                              sem_credit + course.credit, score + weights[i],
+                              potential, reduced + value, rest + value, best,
+                              (path, (course, off, sem))))
+        return best_score, best_path, True
+
+    def solve(
+        self,
+        incumbent: Optional[List[Tuple["Course", "Offering", int]]] = None
+    ) -> List[Tuple["Course", "Offering", int]]:
+        """搜索最优方案,返回 (课程, 班级, 学期) 列表；不劣于 incumbent"""
+        deadline = self.deadline
+        now = time.perf_counter()
+        if now > deadline:  # 预处理已用完时限
+            return incumbent or []
+        best_score = self._score(incumbent) if incumbent else -1
+        # 松弛至多用去剩余时限的一半
+        plan = self._relax(best_score, now + (deadline - now) / 2)
+        if plan is not None:
+            incumbent, best_score = plan, self._score(plan)
+        best_path = None
+        self.nodes = 0
+        self.optimal = False
+
+        # 先只找得分高于 上界-gap 的方案：搜索完毕而找到即最优,未找到则
+        # gap 加倍重试；这些轮次至多用去一半结点预算,之后从目前最优解起搜索
+        ceiling = int(self.bound + 1e-6)
+        gap = 1
+        while True:
+            floor = max(best_score, ceiling - gap)
+            final = floor == best_score
+            score, path, complete = self._search(
+                floor, self.node_limit if final else self.node_limit // 2,
+                deadline)
+            if path is not None:
+                best_score, best_path = score, path
+            if complete and (path is not None or final):
+                self.optimal = True
+                break
+            if final:
+                break
+            gap = gap * 2 if complete else ceiling - best_score
+
+        if best_path is None:
+            return incumbent or []
+        return _unwind(best_path)
+
+
+class ConstraintSolver(_SolverBase):
+    """约束传播排课：每门课是一个变量,取值为 (学期, 班级) 或"不选"。
+
+    搜索前按禁排时间、先修课次序收缩取值域；
+    搜索中每次赋值都沿班级冲突、先修关系与学期学分上限向前传播,
+    取值域被清空的课程直接视为"不选",不再分支。
+    班级冲突不预先展开,传播时才向教学班冲突图查询邻居。
+    """
+
+    def __init__(self,
+                 sorted_courses: List["Course"],
+                 *args,
+                 time_index: Optional[Tuple[ConflictGraph, Sequence[int],
+                                            Sequence[str]]] = None,
+                 **kwargs):
+        """time_index 为 CourseScheduler.time_index() 的结果,缺省时自行建图"""
+        super().__init__(sorted_courses, *args, **kwargs)
+        n = len(sorted_courses)
+        self.dependents: List[List[int]] = [[] for _ in range(n)]
+        for i in range(n):
+            for prereq in sorted_courses[i].prerequisites:
+                if prereq in self.index:
+                    self.dependents[self.index[prereq]].append(i)
+
+        # 取值编码：第 i 门课在其第 k 个可选学期（2k+parity）选第 o 个班级
+        # 对应取值位 k*m+o,m 为该课可用班级数
+        self.domains: List[int] = [0] * n
+        for i in range(n):
+            if self.earliest[i] >= SEMESTERS:
+                continue
+            m = len(self.offerings[i])
+            for k in range(self.earliest[i] // 2, SEMESTERS // 2):
+                self.domains[i] |= ((1 << m) - 1) << (k * m)
+
+        # 图中下标：vertex[i][o] 为第 i 门课第 o 个可用班级,owner 反查其课程；
+        # 同一课程的全部班级在图中相邻,span[i] 为其区间
+        if time_index is None:
+            slot_masks: List[int] = []
+            weeks: List[int] = []
+            ptr = [0]
+            for course in sorted_courses:
+                for off in course.offerings:
+                    slot_masks.append(off.slot_mask)
+                    weeks.append(off.weeks)
+                ptr.append(len(slot_masks))
+            time_index = (ConflictGraph(slot_masks, weeks), ptr,
+                          [c.id for c in sorted_courses])
+        self.graph, ptr, ids = time_index
+        where = {course_id: k for k, course_id in enumerate(ids)}
+        self.owner = [-1] * len(self.graph)
+        self.span: List[Tuple[int, int]] = []
+        self.vertex: List[List[int]] = []
+        season: List[List[int]] = [[], []]
+        for i, course in enumerate(sorted_courses):
+            k = where[course.id]
+            start = ptr[k]
+            self.span.append((start, ptr[k + 1]))
+            vertices = [start + t for t in self.positions[i]]
+            self.vertex.append(vertices)
+            if not self.domains[i]:
+                continue
+            for v in vertices:
+                self.owner[v] = i
+            season[self.parity[i]].extend(vertices)
+        # 各季节参与搜索的班级位集：异季节的班级从不同学期开课,互不冲突
+        self.season = [bitset(vs, len(self.graph)) for vs in season]
+        # 各季节参与搜索的课程按学分降序,供学期学分上限传播提前结束
+        self.by_credit: List[List[int]] = [
+            sorted((i for i in range(n)
+                    if self.domains[i] and self.parity[i] == parity),
+                   key=lambda i: self.courses[i].credit,
+                   reverse=True) for parity in (0, 1)
+        ]
+
+    def _semester_block(self, i: int, sem: int) -> int:
+        """第 i 门课在 sem 学期的全部取值位"""
+        m = len(self.offerings[i])
+        return ((1 << m) - 1) << ((sem // 2) * m)
+
+    def _clear(self, domains: List[int], assigned: int, i: int) -> int:
+        """清空 i 的取值域并级联清空其后续课程,返回失去的权重和"""
+        lost = 0
+        queue = [i]
+        while queue:
+            j = queue.pop()
+            if not domains[j] or assigned >> j & 1:
+                continue
+            domains[j] = 0
+            lost += self.weights[j]
+            queue.extend(self.dependents[j])
+        return lost
+
+    def _propagate(self, domains: List[int], assigned: int, credits: List[int],
+                   i: int, sem: int, o: int) -> int:
+        """在 domains 上传播 i 取 (sem, o),返回因此失去的权重和"""
+        lost = 0
+        clash = self.graph.neighbors(self.vertex[i][o]) & self.season[sem % 2]
+        bits = bin(clash)[:1:-1]  # 低位在前：第 v 个字符即图中第 v 个班级
+        v = bits.find("1")
+        while v >= 0:
+            j = self.owner[v]
+            start, end = self.span[j]
+            v = bits.find("1", end)
+            if j == i or assigned >> j & 1 or not domains[j]:
+                continue
+            # j 的班级区间中冲突者 -> j 的可用班级位集
+            segment = bits[start:end]
+            offs = 0
+            for o, t in enumerate(self.positions[j]):
+                if segment[t:t + 1] == "1":
+                    offs |= 1 << o
+            domains[j] &= ~(offs << ((sem // 2) * len(self.offerings[j])))
+            if not domains[j]:
+                domains[j] = 1  # 交由 _clear 统一计入损失并级联
+                lost += self._clear(domains, assigned, j)
+        for j in self.dependents[i]:
+            if assigned >> j & 1 or not domains[j]:
+                continue
+            for s in range(self.parity[j], sem + 1, 2):
+                domains[j] &= ~self._semester_block(j, s)
+            if not domains[j]:
+                domains[j] = 1
+                lost += self._clear(domains, assigned, j)
+        room = self.credit_limit - credits[sem]
+        for j in self.by_credit[sem % 2]:
+            if self.courses[j].credit <= room:
+                break
+            if assigned >> j & 1 or not domains[j]:
+                continue
+            domains[j] &= ~self._semester_block(j, sem)
+            if not domains[j]:
+                domains[j] = 1
+                lost += self._clear(domains, assigned, j)
+        return lost
+
+    def solve(
+        self,
+        incumbent: Optional[List[Tuple["Course", "Offering", int]]] = None
+    ) -> List[Tuple["Course", "Offering", int]]:
+        """搜索最优方案,返回 (课程, 班级, 学期) 列表；不劣于 incumbent"""
+        best_score = self._score(incumbent) if incumbent else -1
+        best_path = None
+        potential = sum(self.weights[i] for i in range(len(self.courses))
+                        if self.domains[i])
+        # 结点: (变量位置, 取值域, 已赋值位集, 各学期学分, 得分, 得分上界, 路径)
+        stack = [(0, self.domains[:], 0, [0] * SEMESTERS, 0, potential, None)]
+        self.nodes = 0
+        self.optimal = False
+
+        while stack:
+            self.nodes += 1
+            # 每个结点都要沿冲突图传播,开销远大于读时钟,故逐结点检查时限
+            if (self.nodes > self.node_limit
+                    or time.perf_counter() > self.deadline):
+                break
+            pos, domains, assigned, credits, score, potential, path = \
+                stack.pop()
+            if score > best_score:
+                best_score, best_path = score, path
+            if potential <= best_score:
+                continue
+            # 跳过取值域已被清空的变量（视为不选）
+            while pos < len(self.order) and not domains[self.order[pos]]:
+                pos += 1
+            if pos == len(self.order):
+                continue
+
+            i = self.order[pos]
+            course = self.courses[i]
+            weight = self.weights[i]
+            m = len(self.offerings[i])
+            # 不选：最后展开
+            rest = domains[:]
+            lost = weight + sum(
+                self._clear(rest, assigned, j) for j in self.dependents[i])
+            rest[i] = 0
+            stack.append((pos + 1, rest, assigned, credits, score,
+                          potential - lost, path))
+            values = domains[i]
+            children = []
+            while values:
+                low = values & -values
+                values ^= low
+                k, o = divmod(low.bit_length() - 1, m)
+                sem = 2 * k + self.parity[i]
+                if credits[sem] + course.credit > self.credit_limit:
+                    continue
+                child = domains[:]
+                child[i] = 0
+                child_credits = credits[:]
+                child_credits[sem] += course.credit
+                now = assigned | 1 << i
+                lost = self._propagate(child, now, child_credits, i, sem, o)
+                children.append((pos + 1, child, now, child_credits,
+                                 score + weight, potential - lost,
+                                 (path, (course, self.offerings[i][o], sem))))
+            # 学期早、班级序号小的取值最先展开
+            stack.extend(reversed(children))
+        else:
+            self.optimal = True
+
+        if best_path is None:
+            return incumbent or []
+        return _unwind(best_path)
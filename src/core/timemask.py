@@ -0,0 +1,56 @@
+from functools import lru_cache
+from typing import Iterator, List, Tuple
+
+DAYS = 7  # 每周7天
+SLOTS = 13  # 每天13节课
+DAY_MASK = (1 << SLOTS) - 1
+WEEK_BITS = DAYS * SLOTS  # 一周的压缩位图宽度（91位）
+WEEKS_MASK = (1 << 64) - 1  # weeks 位图的有效位（至多64周）
+
+
+def pack_times(times: List[int]) -> int:
+    """将每周7天的上课时间位图压缩为一个整数（第day天第slot节 -> day*13+slot 位）。"""
+    if not times:
+        return 0
+    mask = 0
+    for day, time_day in enumerate(times[:DAYS]):
+        mask |= (time_day & DAY_MASK) << (day * SLOTS)
+    return mask
+
+
+def iter_slots(mask: int) -> Iterator[Tuple[int, int]]:
+    """按位遍历压缩位图,依次给出 (day, slot)。"""
+    while mask:
+        low = mask & -mask
+        yield divmod(low.bit_length() - 1, SLOTS)
+        mask ^= low
+
+
+@lru_cache(maxsize=None)
+def week_spread(weeks: int) -> int:
+    """weeks 中每个第w周对应一个 w*91 位上的1；与压缩位图相乘即按周展开。
+
+    负数按64位补码取位（如 -1 即每周都有课）。
+    """
+    weeks &= WEEKS_MASK
+    spread = 0
+    while weeks:
+        low = weeks & -weeks
+        spread |= 1 << ((low.bit_length() - 1) * WEEK_BITS)
+        weeks ^= low
+    return spread
+
+
+@lru_cache(maxsize=4096)
+def spread_mask(slot_mask: int, weeks: int) -> int:
+    """压缩位图按 weeks 展开为 周×天×节 位图：第w周的压缩位图位于 w*91 位起。
+
+    两个展开后的位图按位与非零,当且仅当二者在同一周的同一天同一节都有课。
+    按 (slot_mask, weeks) 缓存,不必逐个对象保存。
+    """
+    return slot_mask * week_spread(weeks)
+
+
+def is_time_conflict(mask1: int, mask2: int) -> bool:
+    """判断两个时间位图（pack_times 或 spread_mask 的结果）是否有冲突。"""
+    return (mask1 & mask2) != 0